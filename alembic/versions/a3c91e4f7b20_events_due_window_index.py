@@ -0,0 +1,42 @@
+"""events due window index
+
+Revision ID: a3c91e4f7b20
+Revises: 61b0c6e09675
+Create Date: 2026-10-18 12:10:41.508112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91e4f7b20'
+down_revision: Union[str, Sequence[str], None] = '61b0c6e09675'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_events_event_date_start_time',
+            'events',
+            ['event_date', 'start_time'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_events_event_date_start_time',
+            table_name='events',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
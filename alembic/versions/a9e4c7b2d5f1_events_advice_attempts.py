@@ -0,0 +1,49 @@
+"""events advice attempts
+
+Revision ID: a9e4c7b2d5f1
+Revises: c4d9e2f7a1b6
+Create Date: 2026-10-18 21:37:05.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e4c7b2d5f1'
+down_revision: Union[str, Sequence[str], None] = 'c4d9e2f7a1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('events', sa.Column('advice_attempts', sa.SmallInteger(), server_default=sa.text('0'), nullable=False))
+    # Events that keep failing drop out of the sweep and of its partial index
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_events_pending_advice', table_name='events', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            'ix_events_pending_advice',
+            'events',
+            ['event_date', 'start_time'],
+            unique=False,
+            postgresql_where=sa.text('advice IS NULL AND advice_attempts < 3'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_events_pending_advice', table_name='events', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            'ix_events_pending_advice',
+            'events',
+            ['event_date', 'start_time'],
+            unique=False,
+            postgresql_where=sa.text('advice IS NULL'),
+            postgresql_concurrently=True,
+        )
+    op.drop_column('events', 'advice_attempts')
@@ -0,0 +1,66 @@
+"""hot query indexes
+
+Revision ID: b7f4c2d9e813
+Revises: d5e2b8c14a67
+Create Date: 2026-10-18 15:24:06.318472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f4c2d9e813'
+down_revision: Union[str, Sequence[str], None] = 'd5e2b8c14a67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, extra kwargs)
+INDEXES = [
+    # get_user_events, get_next_event_by_user_id, copy_day, clear_user_routine
+    ('ix_events_user_id_event_date_start_time', 'events', ['user_id', 'event_date', 'start_time'], {}),
+    # get_events_without_advice: only events still waiting for advice
+    ('ix_events_pending_advice', 'events', ['event_date', 'start_time'], {
+        'postgresql_where': sa.text('advice IS NULL'),
+    }),
+    # get_active_user_ids, activity statistics
+    ('ix_users_last_active', 'users', ['last_active'], {}),
+    # get_audience_page: keyset by user_id over users with notifications on, index-only scan
+    ('ix_users_audience', 'users', ['user_id'], {
+        'postgresql_where': sa.text('notifications_enabled'),
+        'postgresql_include': ['last_active'],
+    }),
+    # user check-in history
+    ('ix_checkins_user_id_timestamp', 'checkins', ['user_id', 'timestamp'], {}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,101 @@
+"""partition checkins
+
+Revision ID: c4d9e2f7a1b6
+Revises: f3a8b1c6d2e4
+Create Date: 2026-10-18 20:03:18.274519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d9e2f7a1b6'
+down_revision: Union[str, Sequence[str], None] = 'f3a8b1c6d2e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Monthly partitions from the oldest check-in up to this many months ahead;
+# afterwards CheckInPartitions keeps creating them
+MONTHS_AHEAD = 3
+
+COLUMNS = "user_id, timestamp, check_in_type, data, id, created_at"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.rename_table('checkins', 'checkins_legacy')
+    op.execute('ALTER TABLE checkins_legacy RENAME CONSTRAINT checkins_pkey TO checkins_legacy_pkey')
+    op.execute('ALTER INDEX IF EXISTS ix_checkins_user_id_timestamp RENAME TO ix_checkins_legacy_user_id_timestamp')
+    # Keep the id sequence: the new table continues numbering
+    op.execute('ALTER SEQUENCE checkins_id_seq OWNED BY NONE')
+
+    op.create_table('checkins',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('timestamp', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('check_in_type', sa.String(), nullable=False),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('checkins_id_seq'::regclass)"), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'timestamp'),
+    postgresql_partition_by='RANGE (timestamp)'
+    )
+    op.execute('ALTER SEQUENCE checkins_id_seq OWNED BY checkins.id')
+
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', COALESCE((SELECT min(timestamp) FROM checkins_legacy), now()) AT TIME ZONE 'UTC'),
+                    date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF checkins FOR VALUES FROM (%L) TO (%L)',
+                    'checkins_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                    month::text || ' 00:00+00',
+                    (month + interval '1 month')::date::text || ' 00:00+00'
+                );
+            END LOOP;
+        END $$
+    """)
+    # Rows outside the monthly partitions (months already archived, clock skew)
+    # land here instead of failing the insert
+    op.execute('CREATE TABLE checkins_default PARTITION OF checkins DEFAULT')
+
+    op.execute(f'INSERT INTO checkins ({COLUMNS}) SELECT {COLUMNS} FROM checkins_legacy')
+    op.drop_table('checkins_legacy')
+    # Created on the parent, the index is built on every partition
+    op.create_index('ix_checkins_user_id_timestamp', 'checkins', ['user_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Partitions already archived by CheckInPartitions are not restored
+    op.rename_table('checkins', 'checkins_partitioned')
+    op.execute('ALTER INDEX ix_checkins_user_id_timestamp RENAME TO ix_checkins_partitioned_user_id_timestamp')
+    op.execute('ALTER TABLE checkins_partitioned RENAME CONSTRAINT checkins_pkey TO checkins_partitioned_pkey')
+    op.execute('ALTER SEQUENCE checkins_id_seq OWNED BY NONE')
+
+    op.create_table('checkins',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('timestamp', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('check_in_type', sa.String(), nullable=False),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('checkins_id_seq'::regclass)"), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute('ALTER SEQUENCE checkins_id_seq OWNED BY checkins.id')
+    op.execute(f'INSERT INTO checkins ({COLUMNS}) SELECT {COLUMNS} FROM checkins_partitioned')
+    op.drop_table('checkins_partitioned')
+    op.create_index('ix_checkins_user_id_timestamp', 'checkins', ['user_id', 'timestamp'], unique=False)
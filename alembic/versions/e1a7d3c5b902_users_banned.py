@@ -0,0 +1,28 @@
+"""users banned
+
+Revision ID: e1a7d3c5b902
+Revises: b7f4c2d9e813
+Create Date: 2026-10-18 17:41:52.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a7d3c5b902'
+down_revision: Union[str, Sequence[str], None] = 'b7f4c2d9e813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('banned', sa.Boolean(), server_default=sa.text("'False'"), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'banned')
@@ -0,0 +1,60 @@
+"""activity rollups
+
+Revision ID: f3a8b1c6d2e4
+Revises: e1a7d3c5b902
+Create Date: 2026-10-18 19:12:37.561804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8b1c6d2e4'
+down_revision: Union[str, Sequence[str], None] = 'e1a7d3c5b902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('activity_rollups',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('total', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('last_7d', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('last_30d', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('window_date', sa.Date(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index('ix_activity_rollups_total', 'activity_rollups', ['total'], unique=False)
+    op.create_index('ix_activity_rollups_last_7d', 'activity_rollups', ['last_7d'], unique=False)
+    op.create_index('ix_activity_rollups_last_30d', 'activity_rollups', ['last_30d'], unique=False)
+
+    # Backfill from the full history once; afterwards the buffer flush keeps it up to date
+    op.execute("""
+        INSERT INTO activity_rollups (user_id, total, last_7d, last_30d, window_date)
+        SELECT
+            a.user_id,
+            SUM(a.actions),
+            COALESCE(SUM(a.actions) FILTER (WHERE a.activity_date > d.today - 7), 0),
+            COALESCE(SUM(a.actions) FILTER (WHERE a.activity_date > d.today - 30), 0),
+            d.today
+        FROM activities a
+        JOIN users u ON u.user_id = a.user_id
+        CROSS JOIN (SELECT (now() AT TIME ZONE 'Europe/Moscow')::date AS today) d
+        GROUP BY a.user_id, d.today
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_activity_rollups_last_30d', table_name='activity_rollups')
+    op.drop_index('ix_activity_rollups_last_7d', table_name='activity_rollups')
+    op.drop_index('ix_activity_rollups_total', table_name='activity_rollups')
+    op.drop_table('activity_rollups')
@@ -1,4 +1,5 @@
 import logging
+from datetime import timedelta
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from aiogram import Bot, Dispatcher
@@ -10,11 +11,13 @@ from redis.asyncio import Redis
 from app.bot.handlers import checkin, common, settings, other
 from app.bot.handlers.admin import commands, edit_settings
 from app.bot.scheduler.scheduler import setup_scheduler
+from app.bot.scheduler.advice import AdvicePrefetcher
 from app.bot.filters import IsAdmin
 from app.bot.middlewares import DatabaseMiddleware, ActivityCounterMiddleware
-from app.bot.utils import setup_bot_commands
+from app.bot.utils import setup_bot_commands, Broadcaster, BroadcastJobs
 
-from app.core.AI import Advisor_AI
+from app.core.AI import Advisor_AI, AdviceCache, SimilarityIndex
+from app.infrastructure.database import ActivityBuffer, CheckInBuffer, CheckInPartitions, StatisticsSnapshot, UserProfileCache
 
 from config import Settings
 
@@ -61,10 +64,56 @@ async def main(config: Settings):
     
     advisor = Advisor_AI(
         catalog_id=config.YANDEX_GPT_CATALOG_ID,
-        api_key=config.YANDEX_GPT_API_KEY
+        api_key=config.YANDEX_GPT_API_KEY,
+        cache=AdviceCache(
+            redis=redis,
+            ttl=config.ADVICE_CACHE_TTL,
+            variants=config.ADVICE_CACHE_VARIANTS,
+            max_size=config.ADVICE_CACHE_SIZE,
+        ),
+        max_concurrency=config.ADVICE_MAX_CONCURRENCY,
+        timeout=config.ADVICE_TIMEOUT,
+        base_url=config.YANDEX_GPT_BASE_URL,
+        similar=SimilarityIndex(
+            path=config.ADVICE_INDEX_PATH,
+            threshold=config.ADVICE_SIMILARITY_THRESHOLD,
+        ),
     )
     
-    scheduler = setup_scheduler(bot, async_session_maker, admin_ids)
+    broadcaster = Broadcaster(rate=config.BROADCAST_RATE, workers=config.BROADCAST_WORKERS)
+    
+    broadcasts = BroadcastJobs(bot, redis, async_session_maker, admin_ids, broadcaster)
+    
+    advice_prefetcher = AdvicePrefetcher(async_session_maker, admin_ids, advisor)
+    
+    activity_buffer = ActivityBuffer(
+        async_session_maker,
+        interval=config.ACTIVITY_FLUSH_INTERVAL,
+        max_keys=config.ACTIVITY_MAX_PENDING,
+    )
+    
+    checkin_buffer = CheckInBuffer(
+        async_session_maker,
+        interval=config.CHECKIN_FLUSH_INTERVAL,
+        batch_size=config.CHECKIN_BATCH_SIZE,
+        spill_path=config.CHECKIN_SPILL_PATH,
+        max_pending=config.CHECKIN_MAX_PENDING,
+    )
+    
+    profiles = UserProfileCache(redis=redis, ttl=config.PROFILE_CACHE_TTL)
+    
+    checkin_partitions = CheckInPartitions(
+        async_session_maker,
+        archive_dir=config.CHECKIN_ARCHIVE_DIR,
+        retention_months=config.CHECKIN_RETENTION_MONTHS,
+        months_ahead=config.CHECKIN_PARTITIONS_AHEAD,
+    )
+    
+    scheduler = setup_scheduler(
+        bot, async_session_maker, admin_ids, broadcaster, advice_prefetcher, checkin_partitions,
+        advice_index=advisor.similar,
+        advice_index_save_interval=config.ADVICE_INDEX_SAVE_INTERVAL,
+    )
     
     # Add required objects to workflow_data
     dp.workflow_data.update({
@@ -72,8 +121,17 @@ async def main(config: Settings):
         "scheduler": scheduler,
         "admin_ids": admin_ids,
         "advisor": advisor,
+        "advice_prefetcher": advice_prefetcher,
+        "broadcaster": broadcaster,
+        "broadcasts": broadcasts,
+        "checkin_buffer": checkin_buffer,
     })
     
+    await advisor.start()
+    await profiles.start()
+    advice_prefetcher.start()
+    activity_buffer.start()
+    await checkin_buffer.start()
     scheduler.start()
     
     # Подключаем роутеры в нужном порядке
@@ -96,10 +154,29 @@ async def main(config: Settings):
     
     # Middlewares
     logger.info("Including middlewares...")
-    dp.update.middleware(DatabaseMiddleware(async_session_maker, admin_ids))
-    dp.update.middleware(ActivityCounterMiddleware())
+    dp.update.middleware(DatabaseMiddleware(
+        async_session_maker,
+        admin_ids,
+        profiles,
+        last_active_granularity=timedelta(seconds=config.LAST_ACTIVE_GRANULARITY),
+        statistics=StatisticsSnapshot(ttl=config.STATISTICS_TTL),
+    ))
+    dp.update.middleware(ActivityCounterMiddleware(activity_buffer))
     
     await bot.delete_webhook(drop_pending_updates=True)
     
-    await dp.start_polling(bot)
+    await broadcasts.resume()
+    
+    try:
+        await dp.start_polling(bot)
+    finally:
+        logger.info("Shutting down...")
+        scheduler.shutdown(wait=False)
+        await broadcasts.close()
+        await advice_prefetcher.close()
+        await advisor.close()
+        await activity_buffer.close()
+        await checkin_buffer.close()
+        await profiles.close()
+        await engine.dispose()
     
\ No newline at end of file
@@ -1,11 +1,15 @@
 from aiogram import Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
 
+from app.bot.utils import BroadcastJobs
+from app.core.AI import Advisor_AI
 from app.infrastructure.database import Database
 
 router = Router()
 
+ACTIVE_WINDOWS = {"7d": "за 7 дней", "30d": "за 30 дней", "all": "за всё время"}
+
 @router.message(Command("stats"))
 async def cmd_stats(message: Message, db: Database):
 
@@ -24,14 +28,77 @@ async def cmd_stats(message: Message, db: Database):
     await message.answer(text)
 
 @router.message(Command("active"))
-async def cmd_active(message: Message, db: Database):
-    stats = await db.activity.get_statistics()
+async def cmd_active(message: Message, db: Database, command: CommandObject):
+    window = (command.args or "all").strip().lower()
+    if window not in ACTIVE_WINDOWS:
+        return await message.answer("Использование: /active [7d|30d|all]")
+    stats = await db.activity.get_statistics(window)
     
-    await message.answer("<b>Топ активных пользователей</b>\n"+"\n".join(
+    await message.answer(f"<b>Топ активных пользователей ({ACTIVE_WINDOWS[window]})</b>\n"+"\n".join(
                 f"{i}. <b>{stat[0]}</b>: {stat[1]}"
                 for i, stat in enumerate(stats, 1)
             ))
 
+@router.message(Command("ai_stats"))
+async def cmd_ai_stats(message: Message, advisor: Advisor_AI):
+    stats = advisor.stats()
+    cache = stats["cache"]
+    similar = stats["similar"]
+    breaker = stats["breaker"]
+    latency = stats["latency"]
+
+    def fmt(seconds):
+        return "—" if seconds is None else f"{seconds:.2f}s"
+
+    histogram = "\n".join(f"  {label}: {count}" for label, count in latency["histogram"])
+
+    text = f"""<b>Статистика советов ИИ</b>
+
+<b>Кэш советов</b>
+- <b>Попадания:</b> {cache['hits']}
+- <b>Промахи:</b> {cache['misses']}
+- <b>Hit rate:</b> {cache['hit_rate']:.2f}%
+- <b>Ключей в памяти:</b> {cache['local_size']}
+
+<b>Похожие активности</b>
+- <b>В индексе:</b> {similar['size']}
+- <b>Повторно использовано:</b> {similar['hits']} ({similar['hit_rate']:.2f}%)
+
+<b>Запросы к модели</b>
+- <b>Сейчас выполняется:</b> {stats['inflight']}
+- <b>Объединено дублей:</b> {stats['coalesced']}
+- <b>Предохранитель:</b> {breaker['state']} (срабатываний: {breaker['trips']}, отклонено: {breaker['rejected']})
+
+<b>Задержки</b> (последние {latency['samples']})
+- <b>p50 / p95 / p99:</b> {fmt(latency['p50'])} / {fmt(latency['p95'])} / {fmt(latency['p99'])}
+- <b>Текущий таймаут:</b> {fmt(latency['timeout'])}
+<pre>{histogram}</pre>
+"""
+    await message.answer(text)
+
+@router.message(Command("broadcasts"))
+async def cmd_broadcasts(message: Message, broadcasts: BroadcastJobs):
+    jobs = await broadcasts.list_active()
+    if not jobs:
+        return await message.answer("Активных рассылок нет.")
+
+    await message.answer("<b>Активные рассылки</b>\n\n" + "\n".join(
+        f"#{job['id']}: доставлено {job['sent']}, заблокировали {job['blocked']}, "
+        f"ошибок {job['errors']} (курсор: {job['cursor']})\n/broadcast_cancel {job['id']}"
+        for job in jobs
+    ))
+
+@router.message(Command("broadcast_cancel"))
+async def cmd_broadcast_cancel(message: Message, command: CommandObject, broadcasts: BroadcastJobs):
+    job_id = (command.args or "").strip()
+    if not job_id:
+        return await message.answer("Укажите id рассылки: /broadcast_cancel &lt;id&gt;")
+
+    if await broadcasts.cancel(job_id):
+        await message.answer(f"⛔️ Рассылка #{job_id} отменена.")
+    else:
+        await message.answer(f"Рассылка #{job_id} не найдена или уже завершена.")
+
 @router.message(Command("collected_data"))
 async def show_collected_data(message: Message):
     stats_text =(
@@ -1,4 +1,4 @@
-from aiogram import Router, F, Bot
+from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -7,8 +7,7 @@ from aiogram.filters import Command, StateFilter
 
 from app.bot.keyboards import admin
 from app.bot.templates import save_data, BOT_CONFIG
-from app.bot.utils import get_content_info, send_many_messages
-from app.infrastructure.database import Database
+from app.bot.utils import get_content_info, BroadcastJobs
 
 # FSM States
 class AdminConfig(StatesGroup):
@@ -157,28 +156,27 @@ async def back_to_main(callback: CallbackQuery, state: FSMContext):
 @router.message(AdminConfig.waiting_for_mailing_message)
 async def broadcast_from_message(
     message: Message,
-    bot: Bot,
     state: FSMContext,
-    db: Database,
+    broadcasts: BroadcastJobs,
 ):
-    """Рассылает контент из сообщения (текст, фото, документ и т.д.) активным пользователям."""
+    """Запускает фоновую рассылку контента из сообщения (текст, фото, документ и т.д.) активным пользователям."""
     info = get_content_info(message)
     try:
-        await send_many_messages(
-            bot=bot,
-            db=db,
+        job_id = await broadcasts.start(
+            admin_id=message.from_user.id,
             content_type=info["content_type"],
             content_text=info["content_text"],
             file_id=info["file_id"],
-            delay=0.05,
-            mark_blocked=True,
         )
-        await message.answer("✅ Рассылка завершена.")
+        await message.answer(
+            f"🚀 Рассылка #{job_id} запущена в фоне. Я пришлю отчет, когда она закончится.\n\n"
+            "/broadcasts — статус рассылок"
+        )
     except Exception as e:
-        await message.answer(f"Ошибка при рассылке: {e}")
+        await message.answer(f"Ошибка при запуске рассылки: {e}")
         
     await state.set_state(AdminConfig.main_menu)
     await message.answer(
         "Главное меню администратора.",
         reply_markup=admin.main_menu_keyboard
-    )
\ No newline at end of file
+    )
@@ -68,7 +68,7 @@ async def force_next_event(message: Message, bot: Bot, db: Database, advisor: Ad
         )
         return
     try:
-        await send_reminder(bot, user_id, next_event.name, next_event.tag, db, advisor)
+        await send_reminder(bot, user_id, next_event.name, next_event.tag, db, advisor, next_event.advice)
 
         await message.answer("✅ Демо-событие отправлено")
     except Exception as e:
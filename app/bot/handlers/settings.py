@@ -1,18 +1,17 @@
 from datetime import datetime as dt, date, timedelta
 from zoneinfo import ZoneInfo
-from aiogram import Router, F, Bot
+from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, CallbackQuery
 
 from aiogram_calendar import SimpleCalendar, SimpleCalendarCallback
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from app.core.AI import Advisor_AI
 from app.infrastructure.database import Database
 
 from app.bot.keyboards import user as kb
-from app.bot.scheduler.scheduler import setup_user_reminders, get_overview_for_user
+from app.bot.scheduler.advice import AdvicePrefetcher
+from app.bot.scheduler.scheduler import get_overview_for_user
 from app.bot.templates import ROUTINE_TEMPLATES, TAGS
 
 router = Router()
@@ -56,7 +55,7 @@ async def choose_template(callback: CallbackQuery):
     )
 
 @router.callback_query(F.data.startswith("apply_template:"))
-async def apply_template(callback: CallbackQuery, bot: Bot, scheduler: AsyncIOScheduler, db: Database, advisor: Advisor_AI):
+async def apply_template(callback: CallbackQuery, db: Database, advice_prefetcher: AdvicePrefetcher):
     template_key = callback.data.split(":")[1]
     template = ROUTINE_TEMPLATES.get(template_key)
     user_id = callback.from_user.id
@@ -68,10 +67,9 @@ async def apply_template(callback: CallbackQuery, bot: Bot, scheduler: AsyncIOSc
     await callback.message.edit_text(f"Применяю шаблон «{template['name']}»...")
     
     await db.event.clear_user_routine(user_id)
-    for event in template["events"]:
-        await db.event.add_event(user_id, **event)
+    added = await db.event.add_events_bulk(user_id, template["events"])
+    advice_prefetcher.enqueue(added)
     
-    await setup_user_reminders(user_id, bot, scheduler, db, advisor)
     await db.user.set_onboarding_complete(user_id)
     
     routine = await get_overview_for_user(callback.from_user.id, db)
@@ -80,27 +78,20 @@ async def apply_template(callback: CallbackQuery, bot: Bot, scheduler: AsyncIOSc
     
 # Copy yesterday
 @router.callback_query(F.data == "copy_yesterday")
-async def apply_yesterday(callback: CallbackQuery, bot: Bot, scheduler: AsyncIOScheduler, db: Database, advisor: Advisor_AI):
+async def apply_yesterday(callback: CallbackQuery, db: Database, advice_prefetcher: AdvicePrefetcher):
     user_id = callback.from_user.id
     today = dt.now(ZoneInfo("Europe/Moscow")).date()
     yesterday = today - timedelta(days=1)
-    yesterday_events = await db.event.get_user_events(user_id, event_date=yesterday)
+    copied = await db.event.copy_day(user_id, source_date=yesterday, target_date=today)
     
-    if not yesterday_events:
+    if not copied:
         await callback.answer("Вчерашний план пуст. Нечего копировать!", show_alert=True)
         return
     
-    for event in yesterday_events:
-        await db.event.add_event(
-            user_id=user_id,
-            name=event.name,
-            start_time=event.start_time.strftime('%H:%M'),
-            end_time=event.end_time.strftime('%H:%M'),
-            tag=event.tag,
-            event_date=today
-        )
-    
-    await setup_user_reminders(user_id, bot, scheduler, db, advisor)
+    # Советы копируются вместе с событиями, готовить нужно только недостающие
+    advice_prefetcher.enqueue(
+        (event_id, name, tag) for event_id, name, tag, advice in copied if advice is None
+    )
     
     await show_routine_management_screen(callback, user_id, db)
     await callback.answer("✅ Вчерашний план успешно скопирован!")
@@ -198,7 +189,7 @@ async def process_end_minute(callback: CallbackQuery, state: FSMContext):
 
 # Final step
 @router.callback_query(EventCreation.getting_tag, F.data.startswith("set_tag:"))
-async def process_tag_and_finish(callback: CallbackQuery, state: FSMContext, bot: Bot, scheduler: AsyncIOScheduler, db: Database, advisor: Advisor_AI):
+async def process_tag_and_finish(callback: CallbackQuery, state: FSMContext, db: Database, advice_prefetcher: AdvicePrefetcher):
     _, slug = callback.data.split(":")
     
     data = await state.get_data()
@@ -206,13 +197,13 @@ async def process_tag_and_finish(callback: CallbackQuery, state: FSMContext, bot
     start_time = f"{data['start_hour']}:{data['start_minute']}"
     end_time = f"{data['end_hour']}:{data['end_minute']}"
 
-    await db.event.add_event(
+    event_id = await db.event.add_event(
         user_id=callback.from_user.id, name=data['name'],
         start_time=start_time, end_time=end_time, tag=slug, event_date=event_date
     )
+    advice_prefetcher.enqueue([(event_id, data['name'], slug)])
     
     await state.clear()
-    await setup_user_reminders(callback.from_user.id, bot, scheduler, db, advisor, event_date)
     await db.user.set_onboarding_complete(callback.from_user.id)
     
     overview = await get_overview_for_user(callback.from_user.id, db, event_date)
@@ -226,14 +217,13 @@ async def process_tag_and_finish(callback: CallbackQuery, state: FSMContext, bot
 
 # Clear and back Logic
 @router.callback_query(F.data.startswith("delete_event:"))
-async def process_delete_event(callback: CallbackQuery, bot: Bot, db: Database, scheduler: AsyncIOScheduler, advisor: Advisor_AI):
+async def process_delete_event(callback: CallbackQuery, db: Database):
     event_id = callback.data.split(":")[1]
     user_id = callback.from_user.id
 
     deleted = await db.event.delete_event(event_id)
     if deleted:
         await callback.answer("Событие удалено", show_alert=True)
-        await setup_user_reminders(user_id, bot, scheduler, db, advisor)
         await show_routine_management_screen(callback, user_id, db)
     else:
         await callback.answer("Не удалось удалить событие.", show_alert=True)
@@ -246,10 +236,9 @@ async def confirm_clear_routine(callback: CallbackQuery):
     )
 
 @router.callback_query(F.data == "clear_routine_confirmed")
-async def process_clear_routine(callback: CallbackQuery, bot: Bot, scheduler: AsyncIOScheduler, db: Database, advisor: Advisor_AI):
+async def process_clear_routine(callback: CallbackQuery, db: Database):
     user_id = callback.from_user.id
     await db.event.clear_user_routine(user_id)
-    await setup_user_reminders(user_id, bot, scheduler, db, advisor)
     await show_routine_management_screen(callback, user_id, db)
     await callback.answer("Рутина очищена.", show_alert=True)
 
@@ -1,15 +1,27 @@
-from typing import Any, Awaitable, Callable, Dict, Set
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
 from aiogram import BaseMiddleware
 
 from aiogram.types import TelegramObject
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
-from app.infrastructure.database import Database
+from app.infrastructure.database import Database, UserProfileCache
+from app.infrastructure.database.repositories import LAST_ACTIVE_GRANULARITY, StatisticsSnapshot
 
 class DatabaseMiddleware(BaseMiddleware):
-    def __init__(self, session_pool: async_sessionmaker[AsyncSession], admin_ids: Set[int]):
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        admin_ids: Set[int],
+        profiles: Optional[UserProfileCache] = None,
+        last_active_granularity: timedelta = LAST_ACTIVE_GRANULARITY,
+        statistics: Optional[StatisticsSnapshot] = None,
+    ):
         self.session_pool = session_pool
         self.admin_ids = admin_ids
+        self.profiles = profiles
+        self.last_active_granularity = last_active_granularity
+        self.statistics = statistics
         
     async def __call__(
         self, 
@@ -17,15 +29,24 @@ class DatabaseMiddleware(BaseMiddleware):
         event: TelegramObject, 
         data: Dict[str, Any]) -> Any:
         
-        async with self.session_pool() as session:
-            data['db'] = Database(session=session, admin_ids=self.admin_ids)
-            try:
-                result = await handler(event, data)
-            
-                await session.commit()
-                
-            except Exception as e:
-                await session.rollback()
-                raise e
+        # Сессия и соединение берутся только при первом запросе к БД
+        db = Database(
+            session_pool=self.session_pool,
+            admin_ids=self.admin_ids,
+            profiles=self.profiles,
+            last_active_granularity=self.last_active_granularity,
+            statistics=self.statistics,
+        )
+        data['db'] = db
+        try:
+            result = await handler(event, data)
+        
+            await db.commit()
             
-            return result
\ No newline at end of file
+        except Exception as e:
+            await db.rollback()
+            raise e
+        finally:
+            await db.close()
+        
+        return result
\ No newline at end of file
@@ -4,7 +4,6 @@ from typing import Any, Awaitable, Callable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Update, User
 from app.infrastructure.database import Database
-# get_user_banned_status_by_id
 
 logger = logging.getLogger(__name__)
 
@@ -3,12 +3,15 @@ from typing import Any, Awaitable, Callable
 
 from aiogram import BaseMiddleware
 from aiogram.types import Update, User
-from app.infrastructure.database import Database
+from app.infrastructure.database import ActivityBuffer
 
 logger = logging.getLogger(__name__)
 
 
 class ActivityCounterMiddleware(BaseMiddleware):
+    def __init__(self, buffer: ActivityBuffer):
+        self.buffer = buffer
+        
     async def __call__(
         self,
         handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
@@ -22,11 +25,7 @@ class ActivityCounterMiddleware(BaseMiddleware):
         
         result = await handler(event, data)
         
-        db: Database = data.get("db")
-        if db is None:
-            logger.error("No database connection found in middleware data.")
-            raise RuntimeError("Missing database connection for activity logging.")
-        
-        await db.activity.add_user_activity(user_id=user.id)
+        # Запись в БД — пачкой из ActivityBuffer, здесь только счётчик в памяти
+        self.buffer.add(user_id=user.id)
 
         return result
\ No newline at end of file
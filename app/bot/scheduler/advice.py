@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from datetime import datetime as dt, timedelta
+from typing import Dict, Iterable, List, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.AI import Advisor_AI
+from app.core.AI.advice_generator import BATCH_SIZE
+from app.infrastructure.database import Database
+
+logger = logging.getLogger(__name__)
+
+# (event_id, название события, тег)
+AdviceRequest = Tuple[str, str, str]
+
+
+class AdvicePrefetcher:
+    """
+    Готовит советы ИИ для событий заранее, в фоне, и сохраняет их в events.advice.
+    В момент напоминания совет берется из БД без обращения к модели.
+    Хендлеры ставят новые события в очередь через `enqueue`; периодический `sweep`
+    подбирает события, для которых совет еще не готов (ошибка модели, гонка с коммитом
+    хендлера, копирование плана и т.п.).
+    События из одного `enqueue` (шаблон, план пользователя на день) обрабатываются
+    одной пачкой — одним запросом к модели.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        admin_ids: Set[int],
+        advisor: Advisor_AI,
+        workers: int = 4,
+        batch_size: int = BATCH_SIZE,
+        sweep_horizon: timedelta = timedelta(hours=24),
+    ):
+        self.session_pool = session_pool
+        self.admin_ids = admin_ids
+        self.advisor = advisor
+        self.workers = workers
+        self.batch_size = batch_size
+        self.sweep_horizon = sweep_horizon
+        self._queue: asyncio.Queue[List[AdviceRequest]] = asyncio.Queue()
+        self._pending: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"advice-prefetch-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, requests: Iterable[AdviceRequest]) -> None:
+        """Ставит события в очередь на подготовку совета. Не блокирует вызывающего."""
+        batch = []
+        for event_id, name, tag in requests:
+            if event_id in self._pending:
+                continue
+            self._pending.add(event_id)
+            batch.append((event_id, name, tag))
+        for start in range(0, len(batch), self.batch_size):
+            self._queue.put_nowait(batch[start:start + self.batch_size])
+
+    async def sweep(self) -> int:
+        """Ставит в очередь ближайшие события, у которых еще нет совета."""
+        now = dt.now(ZoneInfo("Europe/Moscow"))
+        async with Database(self.session_pool, self.admin_ids) as db:
+            events = await db.event.get_events_without_advice(now, now + self.sweep_horizon)
+        # Пачки собираются по пользователю: события одного дня дают похожий контекст
+        by_user: Dict[int, List[AdviceRequest]] = {}
+        for user_id, event_id, name, tag in events:
+            by_user.setdefault(user_id, []).append((event_id, name, tag))
+        for requests in by_user.values():
+            self.enqueue(requests)
+        if events:
+            logger.info("ADVICE: queued %d events without advice", len(events))
+        return len(events)
+
+    async def _work(self) -> None:
+        while True:
+            batch = await self._queue.get()
+            try:
+                await self._prefetch(batch)
+            except Exception as e:
+                logger.error(f"Failed to prefetch advice for {len(batch)} events: {e}")
+            finally:
+                for event_id, _, _ in batch:
+                    self._pending.discard(event_id)
+                self._queue.task_done()
+
+    async def _prefetch(self, batch: List[AdviceRequest]) -> None:
+        results = await self.advisor.get_advice_batch([(name, tag) for _, name, tag in batch])
+        # Запасной совет по тегу подставляется при отправке, хранить его незачем
+        ready = [
+            (event_id, advice)
+            for (event_id, _, _), ((advice, _), used_ai) in zip(batch, results)
+            if used_ai
+        ]
+        # Неудачи учитываются, чтобы sweep не запрашивал одни и те же события бесконечно
+        failed = [event_id for (event_id, _, _), (_, used_ai) in zip(batch, results) if not used_ai]
+        async with Database(self.session_pool, self.admin_ids) as db:
+            for event_id, advice in ready:
+                await db.event.set_advice(event_id, advice)
+            await db.event.mark_advice_failed(failed)
+            await db.commit()
@@ -0,0 +1,36 @@
+import logging
+from typing import AsyncIterator, Set
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.bot.utils import BroadcastStats
+from app.infrastructure.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+async def iter_audience(session_pool: async_sessionmaker[AsyncSession], admin_ids: Set[int], page_size: int = 1000) -> AsyncIterator[int]:
+    """
+    Отдает user_id аудитории плановых рассылок, читая их страницами.
+    Сессия берется только на время чтения страницы.
+    """
+    cursor = 0
+    while True:
+        async with Database(session_pool, admin_ids) as db:
+            page = await db.user.get_audience_page(after_user_id=cursor, limit=page_size)
+        if not page:
+            return
+        for user_id in page:
+            yield user_id
+        cursor = page[-1]
+
+
+async def mark_unreachable(session_pool: async_sessionmaker[AsyncSession], admin_ids: Set[int], stats: BroadcastStats) -> int:
+    """Исключает из аудитории чаты, в которые не удалось доставить сообщение."""
+    if not stats.blocked_ids:
+        return 0
+    async with Database(session_pool, admin_ids) as db:
+        marked = await db.user.set_inactive_many(stats.blocked_ids)
+        await db.commit()
+    logger.info("Marked %d unreachable users inactive", marked)
+    return marked
@@ -0,0 +1,96 @@
+import logging
+import time
+from datetime import datetime as dt, timedelta
+from typing import Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from aiogram import Bot
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.bot.scheduler.audience import mark_unreachable
+from app.bot.utils import Broadcaster
+from app.bot.templates import TAGS
+from app.infrastructure.database import Database
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LEAD_TIME = timedelta(minutes=15)
+
+
+async def deliver_reminder(bot: Bot, user_id: int, event_name: str, tag: str, advice: Optional[str] = None):
+    """
+    Отправляет напоминание о событии. `advice` — заранее подготовленный совет ИИ;
+    если его нет, используется стандартный совет для тега.
+    """
+    tag_label, default_advice = TAGS.get(tag, TAGS["notag"])
+    tip = f"✨ {advice}" if advice else f"📚 {default_advice}"
+    await bot.send_message(user_id, f"🔔 Через 15 минут — <b>{event_name}</b> ({tag_label})\n\n<i>{tip}</i>")
+
+
+class ReminderDispatcher:
+    """
+    Рассылает напоминания о событиях по данным из БД.
+    Вызывается раз в минуту: одним запросом выбирает события, напоминание о которых
+    попадает в текущее окно, и отправляет их через общий движок рассылок.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        session_pool: async_sessionmaker[AsyncSession],
+        admin_ids: Set[int],
+        broadcaster: Broadcaster,
+        lead_time: timedelta = REMINDER_LEAD_TIME,
+        max_catch_up: timedelta = timedelta(minutes=5),
+    ):
+        self.bot = bot
+        self.session_pool = session_pool
+        self.admin_ids = admin_ids
+        self.broadcaster = broadcaster
+        self.lead_time = lead_time
+        self.max_catch_up = max_catch_up
+        # Конец последнего обработанного окна: следующее окно начинается с него,
+        # поэтому пропущенный или затянувшийся тик не теряет напоминания. Первый тик
+        # после запуска досылает напоминания за `max_catch_up`, пропущенные на рестарте.
+        self._window_end: Optional[dt] = None
+
+    async def tick(self) -> int:
+        """Отправляет напоминания, время которых попадает в окно до конца текущей минуты."""
+        now = dt.now(ZoneInfo("Europe/Moscow")).replace(second=0, microsecond=0)
+        window_end = now + timedelta(minutes=1)
+        window_start = max(self._window_end or now - self.max_catch_up, now - self.max_catch_up)
+        if window_start >= window_end:
+            return 0
+        self._window_end = window_end
+
+        started = time.perf_counter()
+        async with Database(self.session_pool, self.admin_ids) as db:
+            events = await db.event.get_due_events(window_start + self.lead_time, window_end + self.lead_time)
+
+        if not events:
+            return 0
+
+        # У пользователя может быть несколько событий в одном окне: он попадает в рассылку
+        # один раз, а send отправляет его события по порядку. Broadcaster повторяет send
+        # после flood control, поэтому событие считается отправленным только после успеха,
+        # и повтор продолжает с первого неотправленного
+        pending: Dict[int, List] = {}
+        for event in events:
+            pending.setdefault(event.user_id, []).append(event)
+        delivered: Dict[int, int] = {}
+
+        async def send(user_id: int):
+            events = pending[user_id]
+            while (index := delivered.get(user_id, 0)) < len(events):
+                event = events[index]
+                await deliver_reminder(self.bot, user_id, event.name, event.tag, event.advice)
+                delivered[user_id] = index + 1
+
+        stats = await self.broadcaster.run(pending, send, name="reminders")
+        await mark_unreachable(self.session_pool, self.admin_ids, stats)
+        logger.info(
+            "REMINDERS: window %s-%s, %d events, %s in %.2f sec",
+            window_start.strftime('%H:%M'), window_end.strftime('%H:%M'),
+            len(events), stats, time.perf_counter() - started,
+        )
+        return sum(delivered.values())
@@ -1,78 +1,75 @@
 import logging
-from typing import Set
-from datetime import datetime as dt, timedelta, date
+import time
+from typing import Dict, Iterable, Optional, Set
+from datetime import datetime as dt, date
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from app.bot.keyboards.user import get_evening_checkin_keyboard, get_day_checkin_keyboard
-from app.core.AI import Advisor_AI
+from app.core.AI import Advisor_AI, SimilarityIndex
 from app.bot.templates import TAGS
+from app.bot.scheduler.advice import AdvicePrefetcher
+from app.bot.scheduler.audience import iter_audience, mark_unreachable
+from app.bot.scheduler.reminders import ReminderDispatcher, deliver_reminder
+from app.bot.utils import Broadcaster, BroadcastStats
 
-from app.infrastructure.database import Database
+from app.infrastructure.database import Database, CheckInPartitions
 
 logger = logging.getLogger(__name__)
     
-async def send_morning_overview(bot: Bot, db: Database):
-    user_ids = await db.user.get_all_user_ids()
-    event_date = dt.now(ZoneInfo("Europe/Moscow")).date()
-    for user_id in user_ids:
-        text = await get_overview_for_user(user_id, db, event_date=event_date)
-        if text:
-            await bot.send_message(user_id, text)
+async def get_overviews_for_date(db: Database, event_date: date) -> Dict[int, str]:
+    """Строит обзоры дня для всех пользователей одним потоковым запросом."""
+    overviews = {}
+    user_id, events = None, []
+    # Строки приходят упорядоченными по user_id, поэтому группируем на лету
+    async for row in db.event.stream_events_for_date(event_date):
+        if row.user_id != user_id:
+            if events:
+                overviews[user_id] = render_overview(events, event_date)
+            user_id, events = row.user_id, []
+        events.append(row)
+    if events:
+        overviews[user_id] = render_overview(events, event_date)
+    return overviews
 
-async def send_day_checkin(bot: Bot, db: Database):
-    user_ids = await db.user.get_all_user_ids()
-    for user_id in user_ids:
+async def send_morning_overview(bot: Bot, overviews: Dict[int, str], broadcaster: Broadcaster) -> BroadcastStats:
+    started = time.perf_counter()
+    
+    async def send(user_id: int):
+        await bot.send_message(user_id, overviews[user_id])
+    
+    stats = await broadcaster.run(overviews, send, name="morning overview")
+    logger.info("Morning overview sent to %d/%d users in %.2f sec", stats.sent, len(overviews), time.perf_counter() - started)
+    return stats
+
+async def send_day_checkin(bot: Bot, session_pool: async_sessionmaker[AsyncSession], admin_ids: Set[int], broadcaster: Broadcaster) -> int:
+    async def send(user_id: int):
         await bot.send_message(user_id, "Как ты сейчас? Какая обстановка вокруг?", reply_markup=get_day_checkin_keyboard())
+    
+    stats = await broadcaster.run(iter_audience(session_pool, admin_ids), send, name="day checkin")
+    await mark_unreachable(session_pool, admin_ids, stats)
+    return stats.sent
 
 
-async def send_evening_checkin(bot: Bot, db: Database):
-    user_ids = await db.user.get_all_user_ids()
-    for user_id in user_ids:
+async def send_evening_checkin(bot: Bot, session_pool: async_sessionmaker[AsyncSession], admin_ids: Set[int], broadcaster: Broadcaster) -> int:
+    async def send(user_id: int):
         await bot.send_message(user_id, "Как прошёл день в целом?", reply_markup=get_evening_checkin_keyboard())
+    
+    stats = await broadcaster.run(iter_audience(session_pool, admin_ids), send, name="evening checkin")
+    await mark_unreachable(session_pool, admin_ids, stats)
+    return stats.sent
 
-async def send_reminder(bot: Bot, user_id: int, event_name: str, tag: str, db: Database, advisor: Advisor_AI):
+async def send_reminder(bot: Bot, user_id: int, event_name: str, tag: str, db: Database, advisor: Advisor_AI, advice: Optional[str] = None):
     await db.user.get_or_create_user(user_id)
     
     if not await db.user.get_notifications_status_by_id(user_id):
         return
-    info, used_ai = await advisor.get_advice(event_name, tag)
-    tip = '✨ ' if used_ai else '📚 ' 
-    tip += info[0]
-    tag = info[1]
-    await bot.send_message(user_id, f"🔔 Через 15 минут — <b>{event_name}</b> ({tag})\n\n<i>{tip}</i>")
-
-async def setup_user_reminders(user_id: int, bot: Bot, scheduler: AsyncIOScheduler, db: Database, advisor: Advisor_AI, event_date: date = None):
-    if event_date is None:
-        event_date = dt.now(ZoneInfo("Europe/Moscow")).date()
-    for job in scheduler.get_jobs():
-        if job.id.startswith(f"reminder_{user_id}_{event_date.strftime('%Y%m%d')}_"):
-            job.remove()
-
-    events = await db.event.get_user_events(user_id, event_date=event_date)
-    now_msk = dt.now(ZoneInfo("Europe/Moscow"))
-    
-    for event in events:
-        try:
-            reminder_time = dt.combine(event_date, event.start_time,  tzinfo=ZoneInfo("Europe/Moscow")) - timedelta(minutes=15)
-            
-            if reminder_time < now_msk:
-                continue
-            
-            job_id = f"reminder_{user_id}_{event_date.strftime('%Y%m%d')}_{event.id}"
-            scheduler.add_job(
-                send_reminder,
-                trigger="date",
-                run_date=reminder_time,
-                kwargs={"bot": bot, "user_id": user_id, "event_name": event.name, "tag": event.tag, "db": db, "advisor": advisor},
-                id=job_id,
-                replace_existing=True
-            )
-            logger.debug(f"SCHEDULER: Added reminder for {user_id} at {reminder_time.strftime('%H:%M')} for event '{event.name}'")
-        except Exception as e:
-            logger.error(f"Error scheduling reminder for {user_id} on event {event.name}: {e}")
+    if advice is None:
+        (generated, _), used_ai = await advisor.get_advice(event_name, tag)
+        advice = generated if used_ai else None
+    await deliver_reminder(bot, user_id, event_name, tag, advice)
 
 
 async def get_overview_for_user(user_id: int, db: Database, event_date: date = None) -> bool | str:
@@ -81,50 +78,95 @@ async def get_overview_for_user(user_id: int, db: Database, event_date: date = N
     events = await db.event.get_user_events(user_id, event_date)
     if not events:
         return None
+    return render_overview(events, event_date)
+
+def render_overview(events: Iterable, event_date: date) -> str:
     moscow_now = dt.now(ZoneInfo("Europe/Moscow")).date()
     date_str = "сегодня" if event_date == moscow_now else event_date.strftime("%d.%m.%Y")
     overview_text = f"Вот твой ритм на {date_str} 👇\n\n"
     for event in events:
         overview_text += f"<b>{event.start_time.strftime('%H:%M')}–{event.end_time.strftime('%H:%M')}</b> — {event.name} ({TAGS.get(event.tag, ("notag", "Не забудь подготовиться!"))[0]})\n"
     overview_text += "\n\nХорошего дня!"
-    try:
-        return overview_text
-    except Exception as e:
-        logger.error(f"Failed to send overview to {user_id}: {e}")
-        return False
+    return overview_text
 
-def setup_scheduler(bot: Bot, session_pool: async_sessionmaker[AsyncSession], admin_ids: Set[int]):
+def setup_scheduler(bot: Bot, session_pool: async_sessionmaker[AsyncSession], admin_ids: Set[int], broadcaster: Broadcaster, advice_prefetcher: AdvicePrefetcher, checkin_partitions: CheckInPartitions, advice_index: SimilarityIndex, advice_index_save_interval: int = 600):
     scheduler = AsyncIOScheduler(timezone=ZoneInfo("Europe/Moscow"))
     
+    reminders = ReminderDispatcher(bot, session_pool, admin_ids, broadcaster)
+    
+    async def scheduled_reminders():
+        try:
+            await reminders.tick()
+        except Exception as e:
+            logger.error(f"Error in scheduled_reminders: {e}")
+            raise
+    
+    async def scheduled_advice_sweep():
+        try:
+            await advice_prefetcher.sweep()
+        except Exception as e:
+            logger.error(f"Error in scheduled_advice_sweep: {e}")
+            raise
+    
+    async def scheduled_advice_index_save():
+        # Без этого индекс похожих советов пишется только при штатной остановке
+        try:
+            await advice_index.save_async()
+        except Exception as e:
+            logger.error(f"Error in scheduled_advice_index_save: {e}")
+            raise
+    
+    async def scheduled_activity_rollup():
+        try:
+            today = dt.now(ZoneInfo("Europe/Moscow")).date()
+            async with Database(session_pool, admin_ids) as db:
+                rolled = await db.activity.roll_windows(today)
+                await db.commit()
+            logger.info("Activity windows rolled to %s for %d users", today, rolled)
+        except Exception as e:
+            logger.error(f"Error in scheduled_activity_rollup: {e}")
+            raise
+    
+    async def scheduled_checkin_partitions():
+        try:
+            await checkin_partitions.maintain()
+        except Exception as e:
+            logger.error(f"Error in scheduled_checkin_partitions: {e}")
+            raise
+    
     async def scheduled_morning_overview():
-        async with session_pool() as session:
-            try:
-                db = Database(session=session, admin_ids=admin_ids)
-                await send_morning_overview(bot, db)
-            except Exception as e:
-                logger.error(f"Error in scheduled_morning_overview: {e}")
-                raise
+        try:
+            event_date = dt.now(ZoneInfo("Europe/Moscow")).date()
+            async with Database(session_pool, admin_ids) as db:
+                overviews = await get_overviews_for_date(db, event_date)
+            stats = await send_morning_overview(bot, overviews, broadcaster)
+            await mark_unreachable(session_pool, admin_ids, stats)
+        except Exception as e:
+            logger.error(f"Error in scheduled_morning_overview: {e}")
+            raise
     
     async def scheduled_day_checkin():
-        async with session_pool() as session:
-            try:
-                db = Database(session=session, admin_ids=admin_ids)
-                await send_day_checkin(bot, db)
-            except Exception as e:
-                logger.error(f"Error in scheduled_day_checkin: {e}")
-                raise
+        try:
+            await send_day_checkin(bot, session_pool, admin_ids, broadcaster)
+        except Exception as e:
+            logger.error(f"Error in scheduled_day_checkin: {e}")
+            raise
         
             
     async def scheduled_evening_checkin():
-        async with session_pool() as session:
-            try:
-                db = Database(session=session, admin_ids=admin_ids)
-                await send_evening_checkin(bot, db)
-            except Exception as e:
-                logger.error(f"Error in scheduled_evening_checkin: {e}")
-                raise
+        try:
+            await send_evening_checkin(bot, session_pool, admin_ids, broadcaster)
+        except Exception as e:
+            logger.error(f"Error in scheduled_evening_checkin: {e}")
+            raise
     
     
+    scheduler.add_job(scheduled_reminders, "cron", minute="*", second=0, timezone=ZoneInfo("Europe/Moscow"), max_instances=1, coalesce=True, misfire_grace_time=30)
+    scheduler.add_job(scheduled_advice_sweep, "interval", minutes=10, next_run_time=dt.now(ZoneInfo("Europe/Moscow")), max_instances=1, coalesce=True)
+    scheduler.add_job(scheduled_advice_index_save, "interval", seconds=advice_index_save_interval, max_instances=1, coalesce=True)
+    # Пересчёт идемпотентный, поэтому запускаем и при старте — на случай пропущенной полуночи
+    scheduler.add_job(scheduled_activity_rollup, "cron", hour=0, minute=5, next_run_time=dt.now(ZoneInfo("Europe/Moscow")), timezone=ZoneInfo("Europe/Moscow"), max_instances=1, coalesce=True, misfire_grace_time=None)
+    scheduler.add_job(scheduled_checkin_partitions, "cron", hour=3, minute=30, next_run_time=dt.now(ZoneInfo("Europe/Moscow")), timezone=ZoneInfo("Europe/Moscow"), max_instances=1, coalesce=True, misfire_grace_time=None)
     # scheduler.add_job(scheduled_morning_overview, "cron", hour=7, minute=30, timezone=ZoneInfo("Europe/Moscow"), misfire_grace_time=None)
     # scheduler.add_job(scheduled_day_checkin, "cron", hour=13, minute=0, timezone=ZoneInfo("Europe/Moscow"), misfire_grace_time=None)
     # scheduler.add_job(scheduled_evening_checkin, "cron", hour=20, minute=30, timezone=ZoneInfo("Europe/Moscow"), misfire_grace_time=None)
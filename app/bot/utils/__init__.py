@@ -1,2 +1,4 @@
 from .setup_commands import setup_bot_commands
-from .utils import (get_content_info, send_message_user, send_many_messages)
\ No newline at end of file
+from .broadcast import Broadcaster, BroadcastStats
+from .broadcast_jobs import BroadcastJobs
+from .utils import (get_content_info, send_message_user)
\ No newline at end of file
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from aiogram.exceptions import (
+    TelegramForbiddenError,
+    TelegramBadRequest,
+    TelegramRetryAfter,
+    TelegramNotFound,
+)
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_RATE = 28          # сообщений в секунду на бота (лимит API ~30)
+CHAT_INTERVAL = 1.0         # не чаще одного сообщения в секунду в один чат
+
+
+class TokenBucket:
+    """
+    Глобальный ограничитель скорости: `rate` токенов в секунду, не больше `burst` в запасе.
+    `pause` останавливает выдачу токенов всем ожидающим (для TelegramRetryAfter).
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        # Лок выстраивает ожидающих в очередь, чтобы токены раздавались по порядку
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ChatRateLimiter:
+    """Выдерживает минимальный интервал между сообщениями в один и тот же чат."""
+
+    def __init__(self, interval: float = CHAT_INTERVAL, max_size: int = 100_000):
+        self.interval = interval
+        self.max_size = max_size
+        self._next_allowed: Dict[int, float] = {}
+
+    async def acquire(self, chat_id: int) -> None:
+        now = time.monotonic()
+        next_allowed = self._next_allowed.get(chat_id, now)
+        self._next_allowed[chat_id] = max(now, next_allowed) + self.interval
+        if len(self._next_allowed) > self.max_size:
+            self._prune(now)
+        if next_allowed > now:
+            await asyncio.sleep(next_allowed - now)
+
+    def _prune(self, now: float) -> None:
+        self._next_allowed = {chat_id: t for chat_id, t in self._next_allowed.items() if t > now}
+
+
+@dataclass
+class BroadcastStats:
+    """Счетчики рассылки. Обновляются во время работы, их можно читать на лету."""
+    sent: int = 0
+    blocked: int = 0
+    errors: int = 0
+    blocked_ids: List[int] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.errors
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f"sent={self.sent}, blocked={self.blocked}, errors={self.errors}, rate={self.rate:.1f} msg/s"
+
+
+class Broadcaster:
+    """
+    Движок рассылок: `workers` параллельных отправителей, общий для всего бота
+    токен-бакет и ограничение частоты на чат. TelegramRetryAfter ставит на паузу
+    весь бакет, а не только один чат.
+    """
+
+    def __init__(
+        self,
+        rate: float = TELEGRAM_RATE,
+        workers: int = 16,
+        chat_interval: float = CHAT_INTERVAL,
+        max_retries: int = 3,
+        progress_every: int = 1000,
+    ):
+        self.bucket = TokenBucket(rate)
+        self.chats = ChatRateLimiter(chat_interval)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.progress_every = progress_every
+
+    async def run(
+        self,
+        chat_ids: Union[Iterable[int], AsyncIterable[int]],
+        send: Callable[[int], Awaitable[Any]],
+        stats: Optional[BroadcastStats] = None,
+        name: str = "broadcast",
+    ) -> BroadcastStats:
+        """Вызывает `send(chat_id)` для каждого чата с соблюдением лимитов."""
+        stats = stats if stats is not None else BroadcastStats()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def produce():
+            if isinstance(chat_ids, AsyncIterable):
+                async for chat_id in chat_ids:
+                    await queue.put(chat_id)
+            else:
+                for chat_id in chat_ids:
+                    await queue.put(chat_id)
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        async def work():
+            while (chat_id := await queue.get()) is not None:
+                await self._deliver(chat_id, send, stats)
+                if stats.processed % self.progress_every == 0:
+                    logger.info("%s progress: %s", name, stats)
+
+        # Ошибка продюсера (например, БД при чтении аудитории) отменяет воркеров, а не оставляет их ждать очередь
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(produce(), name=f"{name}-producer")
+                for i in range(self.workers):
+                    group.create_task(work(), name=f"{name}-worker-{i}")
+        except BaseExceptionGroup as errors:
+            # Вызывающим нужна исходная ошибка, а не группа
+            raise errors.exceptions[0]
+        logger.info("%s finished: %s", name, stats)
+        return stats
+
+    async def _deliver(self, chat_id: int, send: Callable[[int], Awaitable[Any]], stats: BroadcastStats) -> None:
+        for _ in range(self.max_retries + 1):
+            await self.chats.acquire(chat_id)
+            await self.bucket.acquire()
+            try:
+                await send(chat_id)
+                stats.sent += 1
+                return
+
+            except TelegramRetryAfter as e:
+                logger.warning("Flood control on %d, pausing all sends for %d sec", chat_id, e.retry_after)
+                self.bucket.pause(e.retry_after + 1)
+
+            except (TelegramForbiddenError, TelegramNotFound) as e:
+                logger.warning("Chat %d is unreachable: %s", chat_id, e)
+                stats.blocked += 1
+                stats.blocked_ids.append(chat_id)
+                return
+
+            except TelegramBadRequest as e:
+                logger.error("Bad request for %d: %s", chat_id, e)
+                stats.errors += 1
+                return
+
+            except Exception:
+                logger.exception("Unexpected error sending to %d", chat_id)
+                stats.errors += 1
+                return
+
+        logger.error("Giving up on %d after %d retries", chat_id, self.max_retries)
+        stats.errors += 1
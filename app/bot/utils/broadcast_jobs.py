@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from aiogram import Bot
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.bot.utils.broadcast import Broadcaster, BroadcastStats
+from app.bot.utils.utils import send_message_user
+from app.infrastructure.database import Database
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "broadcast:job:"
+ACTIVE_KEY = "broadcast:active"
+FINISHED_TTL = 7 * 24 * 60 * 60
+
+
+class BroadcastJobs:
+    """
+    Фоновые рассылки с сохранением прогресса в Redis.
+    Аудитория обходится страницами по user_id; после каждой страницы в Redis
+    записываются курсор (последний user_id) и счетчики, поэтому после рестарта
+    рассылка продолжается с места остановки. Сессия БД берется только на время
+    чтения страницы и пометки заблокировавших бота.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        redis: Redis,
+        session_pool: async_sessionmaker[AsyncSession],
+        admin_ids: Set[int],
+        broadcaster: Broadcaster,
+        page_size: int = 500,
+    ):
+        self.bot = bot
+        self.redis = redis
+        self.session_pool = session_pool
+        self.admin_ids = admin_ids
+        self.broadcaster = broadcaster
+        self.page_size = page_size
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def start(self, admin_id: int, content_type: str, content_text: Optional[str] = None, file_id: Optional[str] = None) -> str:
+        """Создает рассылку и запускает ее в фоне. Возвращает id рассылки."""
+        job_id = str(int(time.time() * 1000))
+        await self.redis.hset(KEY_PREFIX + job_id, mapping={
+            "admin_id": admin_id,
+            "content_type": content_type,
+            "content_text": content_text or "",
+            "file_id": file_id or "",
+            "status": "running",
+            "cursor": 0,
+            "sent": 0,
+            "blocked": 0,
+            "errors": 0,
+            "created_at": int(time.time()),
+        })
+        await self.redis.sadd(ACTIVE_KEY, job_id)
+        self._spawn(job_id)
+        return job_id
+
+    async def resume(self) -> int:
+        """Возобновляет незавершенные рассылки после рестарта."""
+        resumed = 0
+        for raw_id in await self.redis.smembers(ACTIVE_KEY):
+            job_id = _decode(raw_id)
+            job = await self.get(job_id)
+            if job is None or job["status"] != "running":
+                await self.redis.srem(ACTIVE_KEY, job_id)
+                continue
+            self._spawn(job_id)
+            resumed += 1
+        if resumed:
+            logger.info("Resumed %d broadcast jobs", resumed)
+        return resumed
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.hgetall(KEY_PREFIX + job_id)
+        if not raw:
+            return None
+        job = {_decode(k): _decode(v) for k, v in raw.items()}
+        job["id"] = job_id
+        return job
+
+    async def list_active(self) -> List[Dict[str, Any]]:
+        jobs = []
+        for raw_id in await self.redis.smembers(ACTIVE_KEY):
+            job = await self.get(_decode(raw_id))
+            if job is not None:
+                jobs.append(job)
+        return sorted(jobs, key=lambda job: job["id"])
+
+    async def cancel(self, job_id: str) -> bool:
+        job = await self.get(job_id)
+        if job is None or job["status"] != "running":
+            return False
+        await self._finish(job_id, "cancelled")
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        return True
+
+    async def close(self) -> None:
+        """Останавливает локальные задачи. Статус остается running, чтобы resume их подхватил."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _spawn(self, job_id: str) -> None:
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job_id), name=f"broadcast-{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.get(job_id)
+        if job is None:
+            return
+        key = KEY_PREFIX + job_id
+        cursor = int(job["cursor"])
+        stats = BroadcastStats(sent=int(job["sent"]), blocked=int(job["blocked"]), errors=int(job["errors"]))
+
+        async def send(user_id: int):
+            await send_message_user(
+                self.bot, user_id, job["content_type"],
+                content_text=job["content_text"] or None,
+                file_id=job["file_id"] or None,
+            )
+
+        try:
+            while True:
+                # Рассылку могли отменить с другой реплики
+                if _decode(await self.redis.hget(key, "status")) != "running":
+                    return
+
+                async with Database(self.session_pool, self.admin_ids) as db:
+                    user_ids = await db.user.get_active_user_ids_page(after_user_id=cursor, limit=self.page_size)
+                if not user_ids:
+                    break
+
+                stats.blocked_ids = []
+                await self.broadcaster.run(user_ids, send, stats, name=f"broadcast #{job_id}")
+
+                if stats.blocked_ids:
+                    async with Database(self.session_pool, self.admin_ids) as db:
+                        await db.user.set_inactive_many(stats.blocked_ids)
+                        await db.commit()
+
+                cursor = user_ids[-1]
+                await self.redis.hset(key, mapping={
+                    "cursor": cursor,
+                    "sent": stats.sent,
+                    "blocked": stats.blocked,
+                    "errors": stats.errors,
+                })
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Broadcast #%s failed", job_id)
+            await self._finish(job_id, "failed")
+            await self._notify(job, f"❌ Рассылка #{job_id} прервана: {e}")
+            return
+
+        await self._finish(job_id, "done")
+        await self._notify(
+            job,
+            f"✅ Рассылка #{job_id} завершена.\n\n"
+            f"Доставлено: {stats.sent}\nЗаблокировали бота: {stats.blocked}\nОшибок: {stats.errors}",
+        )
+
+    async def _finish(self, job_id: str, status: str) -> None:
+        key = KEY_PREFIX + job_id
+        await self.redis.hset(key, "status", status)
+        await self.redis.expire(key, FINISHED_TTL)
+        await self.redis.srem(ACTIVE_KEY, job_id)
+
+    async def _notify(self, job: Dict[str, Any], text: str) -> None:
+        try:
+            await self.bot.send_message(int(job["admin_id"]), text)
+        except Exception as e:
+            logger.warning("Failed to notify admin about broadcast #%s: %s", job["id"], e)
+
+
+def _decode(value: Any) -> Any:
+    return value.decode() if isinstance(value, bytes) else value
@@ -13,7 +13,9 @@ async def setup_bot_commands(bot: Bot, admin_ids: Set[int]):
     admin_commands = default_commands + [
         BotCommand(command="menu", description="⚙️ Админ панель"),
         BotCommand(command="stats", description="📊 Общая статистика бота"),
-        BotCommand(command="active", description="🏆 Топ самых активных пользователей"),
+        BotCommand(command="active", description="🏆 Топ активных пользователей: 7d, 30d или all"),
+        BotCommand(command="broadcasts", description="📨 Статус рассылок"),
+        BotCommand(command="ai_stats", description="✨ Статистика советов ИИ"),
         BotCommand(command="collected_data", description="🫂 Данные опроса"),
         BotCommand(command="methodology", description="🫂 Вопросы опроса"),
     ] 
@@ -1 +1,5 @@
-from .advice_generator import Advisor_AI
\ No newline at end of file
+from .advice_generator import Advisor_AI
+from .cache import AdviceCache
+from .resilience import CircuitBreaker, LatencyTracker
+from .client import YandexGPTClient
+from .similarity import SimilarityIndex
\ No newline at end of file
@@ -1,28 +1,63 @@
+import asyncio
+import json
 import logging
+import time
 from asyncio import TimeoutError, wait_for
-from typing import Tuple
-from yandex_gpt import YandexGPT, YandexGPTConfigManagerForAPIKey
+from typing import Any, Dict, List, Optional, Tuple
 from config import Settings
 
 from app.bot.templates import TAGS
+from app.core.AI.cache import AdviceCache
+from app.core.AI.client import YandexGPTClient
+from app.core.AI.resilience import CircuitBreaker, LatencyTracker
+from app.core.AI.similarity import SimilarityIndex
 
 logger = logging.getLogger(__name__)
+
+# Сколько событий просить у модели за один запрос
+BATCH_SIZE = 10
+
 class Advisor_AI:
-    def __init__(self, catalog_id: str, api_key: str):
+    def __init__(
+        self,
+        catalog_id: str,
+        api_key: str,
+        cache: Optional[AdviceCache] = None,
+        max_concurrency: int = 8,
+        timeout: float = 10.0,
+        base_url: Optional[str] = None,
+        similar: Optional[SimilarityIndex] = None,
+    ):
         self.catalog_id = catalog_id
         self.api_key = api_key
+        self.cache = cache or AdviceCache()
+        self.similar = similar if similar is not None else SimilarityIndex()
+        self.latency = LatencyTracker(max_timeout=timeout)
+        self.breaker = CircuitBreaker(slow_call=timeout / 2)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Запросы к модели, которые выполняются прямо сейчас: ключ кэша -> задача
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0
         self._client = None
-        try:
-            self._client = YandexGPT(
-                config_manager=YandexGPTConfigManagerForAPIKey(
-                model_type="yandexgpt-lite",
+        if catalog_id and api_key:
+            self._client = YandexGPTClient(
                 catalog_id=self.catalog_id,
                 api_key=self.api_key,
-                )
+                base_url=base_url,
+                pool_size=max_concurrency,
             )
-            logger.info("YandexGPT successfully connected!")
-        except Exception as e:
-            logger.error(f"Error connecting YandexGPT: {e}")
+        else:
+            logger.error("YandexGPT credentials are not set, using fallback advice only")
+
+    async def start(self) -> None:
+        self.similar.load()
+        if self._client:
+            await self._client.start()
+
+    async def close(self) -> None:
+        if self._client:
+            await self._client.close()
+        self.similar.save()
             
     def _get_prompt(self, activity: str, tag: str) -> str:
         return f"""
@@ -70,25 +105,228 @@ tag: (тег, совет)
 Тег: {tag}
 """
 
-    async def get_advice(self, activity: str, tag: str) -> Tuple[str, bool]:
+    def _get_batch_prompt(self, items: List[Tuple[str, str]]) -> str:
+        events = "\n".join(
+            f'{i}. Активность: "{activity}", тег: {tag}' for i, (activity, tag) in enumerate(items, start=1)
+        )
+        return f"""
+Ты — помощник по саморегуляции для подростков. Твоя задача — дать короткий, практичный совет для каждого события из списка, который поможет справиться с сенсорной нагрузкой.
+
+ПРАВИЛА:
+1. Каждый совет должен быть коротким (1-2 предложения)
+2. Используй дружелюбный, поддерживающий тон
+3. Не давай общих фраз — совет должен быть конкретным для своего события
+4. Избегай морализаторства ("ты должен", "обязательно")
+5. Используй конструкции: "Можно попробовать...", "Помогает...", "Обрати внимание..."
+
+ЗНАЧЕНИЯ ТЕГОВ:
+"notag" — нейтрально, "quiet" — тихо, "loud" — шумно, "crowd" — много людей,
+"bright" — яркий свет, "dim" — тусклый свет, "calm" — спокойно
+
+ФОРМАТ ОТВЕТА:
+Только JSON-массив из {len(items)} строк — по одному совету на каждое событие, в том же порядке. Без лишних слов.
+
+ПРИМЕР:
+1. Активность: "Уроки математики в классе", тег: crowd
+2. Активность: "Прогулка в парке вечером", тег: calm
+["Если чувствуешь перегрузку от одноклассников, попробуй 2 минуты смотреть в окно или глубоко вдохнуть.", "Насладись моментом тишины — глубокое дыхание поможет закрепить спокойное состояние."]
+
+ТЕКУЩИЙ ЗАПРОС:
+{events}
+"""
+
+    @staticmethod
+    def _parse_batch(completion: str, size: int) -> List[Optional[str]]:
+        """Разбирает JSON-массив советов. Неразобранные и невалидные элементы — None."""
+        start, end = completion.find("["), completion.rfind("]")
+        try:
+            data = json.loads(completion[start:end + 1]) if 0 <= start < end else []
+        except ValueError:
+            data = []
+        if not isinstance(data, list):
+            data = []
+
+        result = []
+        for i in range(size):
+            advice = data[i].strip() if i < len(data) and isinstance(data[i], str) else ""
+            result.append(advice if 5 < len(advice) < 200 else None)
+        return result
+
+    @staticmethod
+    def _fallback(tag: str) -> Tuple[str, str]:
+        """Совет по умолчанию для тега в том же формате, что и ответ модели: (совет, тег)."""
+        label, advice = TAGS.get(tag, TAGS["notag"])
+        return advice, label
+
+    async def get_advice(self, activity: str, tag: str) -> Tuple[Tuple[str, str], bool]:
         if not activity.strip() or len(activity) > 100:
-            return TAGS.get(tag, TAGS["notag"]), False
+            return self._fallback(tag), False
+        
+        cached = await self.cache.get(activity, tag) or self.similar.lookup(activity, tag)
+        if cached is not None:
+            return (cached, TAGS.get(tag, TAGS["notag"])[0]), True
         
         if not self._client:
-            return TAGS.get(tag, TAGS["notag"]), False
+            return self._fallback(tag), False
+        
+        # Одинаковые одновременные запросы ждут одно обращение к модели
+        key = self.cache.make_key(activity, tag)
+        task = self._inflight.get(key)
+        if task is None:
+            # Пока предохранитель разомкнут, сразу отдаём совет по умолчанию
+            if self.breaker.is_open:
+                return self._fallback(tag), False
+            task = asyncio.create_task(self._complete(activity, tag))
+            self._track(key, task)
+        else:
+            self.coalesced += 1
+        
+        # shield: отмена одного из ожидающих не отменяет запрос для остальных
+        advice = await asyncio.shield(task)
+        if advice is None:
+            return self._fallback(tag), False
+        return (advice, TAGS.get(tag, TAGS["notag"])[0]), True
+
+    async def get_advice_batch(self, items: List[Tuple[str, str]]) -> List[Tuple[Tuple[str, str], bool]]:
+        """
+        Советы для списка пар (активность, тег) одним запросом к модели.
+        Результат в том же порядке и формате, что и у `get_advice`; для элементов,
+        которые не удалось получить или разобрать, — совет по умолчанию.
+        """
+        results: List[Optional[str]] = [None] * len(items)
+        missing: Dict[str, List[int]] = {}
+        for i, (activity, tag) in enumerate(items):
+            if not activity.strip() or len(activity) > 100:
+                continue
+            results[i] = await self.cache.get(activity, tag) or self.similar.lookup(activity, tag)
+            if results[i] is None:
+                missing.setdefault(self.cache.make_key(activity, tag), []).append(i)
+
+        # Одинаковые события в пачке отправляются в модель один раз, а ключи, по которым
+        # запрос уже идёт (одиночный или из другой пачки), ждут его, а не запрашиваются снова
+        waiting: List[Tuple[List[int], asyncio.Task]] = []
+        pending: List[Tuple[str, List[int]]] = []
+        for key, indexes in missing.items():
+            task = self._inflight.get(key)
+            if task is not None:
+                self.coalesced += 1
+                waiting.append((indexes, task))
+            else:
+                pending.append((key, indexes))
+
+        for start in range(0, len(pending) if self._client else 0, BATCH_SIZE):
+            chunk = pending[start:start + BATCH_SIZE]
+            if self.breaker.is_open:
+                break
+            batch_task = asyncio.create_task(self._complete_batch([items[indexes[0]] for _, indexes in chunk]))
+            for position, (key, indexes) in enumerate(chunk):
+                task = asyncio.create_task(self._pick(batch_task, position))
+                self._track(key, task)
+                waiting.append((indexes, task))
+            await asyncio.shield(batch_task)
+
+        for indexes, task in waiting:
+            advice = await asyncio.shield(task)
+            if advice is None:
+                continue
+            for i in indexes:
+                results[i] = advice
+
+        return [
+            ((advice, TAGS.get(tag, TAGS["notag"])[0]), True) if advice is not None else (self._fallback(tag), False)
+            for advice, (_, tag) in zip(results, items)
+        ]
+
+    def _track(self, key: str, task: asyncio.Task) -> None:
+        """Регистрирует запрос по ключу в `_inflight` до его завершения."""
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+    async def _complete_batch(self, items: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """Один пакетный запрос к модели. Для неполученных советов — None."""
+        completion = await self._request(self._get_batch_prompt(items), batch=True)
+        if completion is None:
+            return [None] * len(items)
+        advices = self._parse_batch(completion, len(items))
+        for (activity, tag), advice in zip(items, advices):
+            if advice is not None:
+                await self._remember(activity, tag, advice)
+        return advices
+
+    @staticmethod
+    async def _pick(batch_task: asyncio.Task, position: int) -> Optional[str]:
+        return (await asyncio.shield(batch_task))[position]
+
+    async def _complete(self, activity: str, tag: str) -> Optional[str]:
+        """Один запрос к модели. None, если ответа нет или он не прошёл проверку."""
+        completion = await self._request(self._get_prompt(activity, tag))
+        if completion is None:
+            return None
+        advice = completion.strip()
+        
+        if not advice or not (5<len(advice)<200):
+            return None
         
+        await self._remember(activity, tag, advice)
+        return advice
+
+    async def _remember(self, activity: str, tag: str, advice: str) -> None:
+        await self.cache.put(activity, tag, advice)
+        self.similar.add(activity, tag, advice)
+
+    async def _request(self, prompt: str, batch: bool = False) -> Optional[str]:
+        """
+        Запрос к модели через семафор и предохранитель. None при ошибке, таймауте
+        или если предохранитель не пропустил запрос. Проба предохранителя берётся
+        только после получения слота и всегда завершается записью результата.
+        Пакетные запросы заведомо дольше одиночных, поэтому идут с максимальным
+        таймаутом и не попадают в статистику задержек.
+        """
+        timeout = self.latency.max_timeout if batch else self.latency.timeout
+        started = time.monotonic()
         try:
-            messages = [{"role": "user", "text": self._get_prompt(activity, tag)}]
+            # Ждём свободный слот не дольше таймаута, чтобы не копить очередь корутин
+            await wait_for(self._semaphore.acquire(), timeout=timeout)
+        except TimeoutError:
+            logger.warning("YandexGPT is saturated, using fallback advice")
+            return None
+
+        if not self.breaker.allow():
+            self._semaphore.release()
+            return None
+
+        try:
+            started = time.monotonic()
+            messages = [{"role": "user", "text": prompt}]
             completion = await wait_for(
                 self._client.get_async_completion(messages=messages),
-                timeout=10.0
+                timeout=timeout
             )
-            advice = completion.strip()
-            
-            if not advice or not (5<len(advice)<200):
-                return TAGS.get(tag, TAGS["notag"]), False
-            
-            return (advice, TAGS.get(tag, TAGS["notag"][0])[0]), True
+            latency = time.monotonic() - started
+            if not batch:
+                self.latency.observe(latency)
+            self.breaker.record(True, 0.0 if batch else latency)
+            return completion
         except (TimeoutError, Exception) as e:
+            latency = time.monotonic() - started
+            if not batch:
+                self.latency.observe(latency)
+            self.breaker.record(False, latency)
             logger.warning(f"YandexGPT ERROR ({type(e).__name__})")
-            return TAGS.get(tag, TAGS["notag"]), False
+            return None
+        except asyncio.CancelledError:
+            # Запрос отменён, а не провалился: только освобождаем пробу
+            self.breaker.release()
+            raise
+        finally:
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache": self.cache.stats(),
+            "similar": self.similar.stats(),
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "breaker": self.breaker.stats(),
+            "latency": self.latency.stats(),
+        }
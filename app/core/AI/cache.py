@@ -0,0 +1,121 @@
+import logging
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_activity(activity: str) -> str:
+    """Приводит название активности к каноничному виду: "Уроки в школе!!" -> "уроки в школе"."""
+    text = activity.lower().replace("ё", "е")
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class AdviceCache:
+    """
+    Двухуровневый кэш советов: LRU в памяти процесса перед общим кэшем в Redis.
+    Ключ — (нормализованная активность, тег). На ключ хранится небольшой пул
+    вариантов совета, чтобы одинаковые события не получали один и тот же текст.
+    Пока пул не заполнен, часть запросов считается промахом и уходит в модель.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        ttl: int = 7 * 24 * 60 * 60,
+        variants: int = 3,
+        max_size: int = 2048,
+        local_ttl: int = 10 * 60,
+        prefix: str = "advice:",
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.variants = variants
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._local: OrderedDict[str, Tuple[float, List[str]]] = OrderedDict()
+
+    def make_key(self, activity: str, tag: str) -> str:
+        return f"{tag}:{normalize_activity(activity)}"
+
+    async def get(self, activity: str, tag: str) -> Optional[str]:
+        """Возвращает случайный вариант совета или None, если нужно обратиться к модели."""
+        key = self.make_key(activity, tag)
+        pool = self._get_local(key)
+        if pool is None:
+            pool = await self._get_shared(key)
+            self._set_local(key, pool)
+
+        # Незаполненный пул пополняется с вероятностью, пропорциональной нехватке вариантов
+        if not pool or random.random() >= len(pool) / self.variants:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return random.choice(pool)
+
+    async def put(self, activity: str, tag: str, advice: str) -> None:
+        key = self.make_key(activity, tag)
+        pool = self._get_local(key) or []
+        pool = ([item for item in pool if item != advice] + [advice])[-self.variants:]
+        self._set_local(key, pool)
+
+        if self.redis is None:
+            return
+        try:
+            # MULTI: повтор того же текста переносится в конец, а не занимает второй слот пула
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.lrem(self.prefix + key, 0, advice)
+                pipe.rpush(self.prefix + key, advice)
+                pipe.ltrim(self.prefix + key, -self.variants, -1)
+                pipe.expire(self.prefix + key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Advice cache write failed ({type(e).__name__})")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total * 100 if total else 0.0,
+            "local_size": len(self._local),
+        }
+
+    def _get_local(self, key: str) -> Optional[List[str]]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, pool = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return pool
+
+    def _set_local(self, key: str, pool: List[str]) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, pool)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    async def _get_shared(self, key: str) -> List[str]:
+        if self.redis is None:
+            return []
+        try:
+            raw = await self.redis.lrange(self.prefix + key, 0, -1)
+        except Exception as e:
+            logger.warning(f"Advice cache read failed ({type(e).__name__})")
+            return []
+        return [item.decode() if isinstance(item, bytes) else item for item in raw]
@@ -0,0 +1,78 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://llm.api.cloud.yandex.net"
+
+
+class YandexGPTClient:
+    """
+    Клиент синхронного API completion YandexGPT поверх одной долгоживущей aiohttp-сессии.
+    Пул соединений, кэш DNS и keep-alive позволяют не платить за TCP/TLS-рукопожатие
+    на каждый совет. Сессия создаётся в `start()` и закрывается в `close()`.
+    """
+
+    def __init__(
+        self,
+        catalog_id: str,
+        api_key: str,
+        model: str = "yandexgpt-lite",
+        base_url: Optional[str] = None,
+        pool_size: int = 8,
+        dns_ttl: int = 300,
+        keepalive: float = 60.0,
+        temperature: float = 0.6,
+        max_tokens: int = 1000,
+    ):
+        self.catalog_id = catalog_id
+        self.api_key = api_key
+        self.model_uri = f"gpt://{catalog_id}/{model}"
+        self.url = (base_url or DEFAULT_BASE_URL).rstrip("/") + "/foundationModels/v1/completion"
+        self.pool_size = pool_size
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        if self._session is not None:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                "Authorization": f"Api-Key {self.api_key}",
+                "x-folder-id": self.catalog_id,
+            },
+            raise_for_status=True,
+        )
+        logger.info(f"YandexGPT client started ({self.url})")
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_async_completion(self, messages: List[Dict[str, str]]) -> str:
+        if self._session is None:
+            raise RuntimeError("YandexGPT client is not started")
+        payload: Dict[str, Any] = {
+            "modelUri": self.model_uri,
+            "completionOptions": {
+                "stream": False,
+                "temperature": self.temperature,
+                "maxTokens": self.max_tokens,
+            },
+            "messages": messages,
+        }
+        async with self._session.post(self.url, json=payload) as resp:
+            data = await resp.json()
+        return data["result"]["alternatives"][0]["message"]["text"]
@@ -0,0 +1,150 @@
+import logging
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS: Tuple[float, ...] = (0.5, 1.0, 2.0, 3.0, 5.0, 10.0)
+
+
+class LatencyTracker:
+    """Скользящее окно задержек ответов модели: перцентили, гистограмма и адаптивный таймаут."""
+
+    def __init__(
+        self,
+        window: int = 200,
+        min_timeout: float = 2.0,
+        max_timeout: float = 10.0,
+        factor: float = 1.5,
+        min_samples: int = 20,
+    ):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.factor = factor
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._buckets: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    @property
+    def timeout(self) -> float:
+        """Таймаут запроса: p95 с запасом, но в пределах [min_timeout, max_timeout]."""
+        if len(self._samples) < self.min_samples:
+            return self.max_timeout
+        p95 = self.percentile(0.95)
+        return max(self.min_timeout, min(self.max_timeout, p95 * self.factor))
+
+    def histogram(self) -> List[Tuple[str, int]]:
+        labels = [f"≤{bound:g}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]:g}s"]
+        return list(zip(labels, self._buckets))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self._samples),
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "timeout": self.timeout,
+            "histogram": self.histogram(),
+        }
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для запросов к модели.
+    closed    — запросы идут как обычно, результаты копятся в окне;
+    open      — доля ошибок или медленных ответов превысила порог, запросы не выполняются;
+    half_open — по истечении reset_timeout пропускается один пробный запрос.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_rate: float = 0.5,
+        slow_call: float = 5.0,
+        reset_timeout: float = 30.0,
+    ):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probe = False
+        # (ошибка, медленный ответ) по последним вызовам
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+
+    @property
+    def is_open(self) -> bool:
+        """Предохранитель разомкнут и пробный запрос ещё рано пропускать. Пробу не занимает."""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probe = False
+            logger.info("AI circuit breaker half-open")
+        if self.state == self.HALF_OPEN:
+            if self._probe:
+                self.rejected += 1
+                return False
+            self._probe = True
+        return True
+
+    def release(self) -> None:
+        """Освобождает пробу, если разрешённый запрос так и не был выполнен."""
+        if self.state == self.HALF_OPEN:
+            self._probe = False
+
+    def record(self, ok: bool, latency: float) -> None:
+        slow = latency >= self.slow_call
+        if self.state == self.HALF_OPEN:
+            if ok and not slow:
+                self.state = self.CLOSED
+                self._calls.clear()
+                logger.info("AI circuit breaker closed")
+            else:
+                self._open()
+            return
+
+        self._calls.append((not ok, slow))
+        if self.state == self.CLOSED and len(self._calls) >= self.min_calls:
+            errors = sum(failed for failed, _ in self._calls) / len(self._calls)
+            slows = sum(slow for _, slow in self._calls) / len(self._calls)
+            if errors >= self.error_rate or slows >= self.slow_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self._calls.clear()
+        logger.warning(f"AI circuit breaker opened for {self.reset_timeout:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "trips": self.trips, "rejected": self.rejected}
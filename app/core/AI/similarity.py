@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.AI.cache import normalize_activity
+
+logger = logging.getLogger(__name__)
+
+
+class SimilarityIndex:
+    """
+    Индекс похожих активностей для повторного использования советов.
+    Название раскладывается на символьные n-граммы, которые хэшируются в `dim` признаков
+    (hashing trick), и взвешивается по TF-IDF. Матрица хранится в CSR-виде (indptr/indices/counts),
+    сходство — косинусное, только среди записей с тем же тегом.
+    Добавление дешёвое: строка дописывается в хвост, а IDF и нормы пересчитываются лениво,
+    при первом поиске после изменений.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.55,
+        max_items: int = 5000,
+        dim: int = 1 << 16,
+        ngrams: Tuple[int, ...] = (2, 3, 4),
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.max_items = max_items
+        self.dim = dim
+        self.ngrams = ngrams
+        self.hits = 0
+        self.misses = 0
+        # Изменений с последнего сохранения
+        self._unsaved = 0
+
+        self._keys: Dict[Tuple[str, str], int] = {}
+        self._tags: List[str] = []
+        self._advice: List[str] = []
+        self._rows: List[Tuple[np.ndarray, np.ndarray]] = []
+
+        # Производные массивы, пересобираются в `_reweight`
+        self._dirty = True
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._idf = np.ones(dim, dtype=np.float32)
+        self._tag_codes = np.zeros(0, dtype=np.int32)
+        self._tag_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Хэшированные n-граммы текста: (индексы признаков, частоты)."""
+        padded = f" {text} "
+        counts = Counter(
+            zlib.crc32(padded[i:i + n].encode()) % self.dim
+            for n in self.ngrams
+            for i in range(len(padded) - n + 1)
+        )
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return indices, values
+
+    def add(self, activity: str, tag: str, advice: str) -> None:
+        text = normalize_activity(activity)
+        if not text:
+            return
+        row = self._keys.get((tag, text))
+        if row is not None:
+            self._advice[row] = advice
+            self._unsaved += 1
+            return
+
+        if len(self._rows) >= self.max_items:
+            self._evict(len(self._rows) - self.max_items + 1)
+        self._keys[(tag, text)] = len(self._rows)
+        self._tags.append(tag)
+        self._advice.append(advice)
+        self._rows.append(self._features(text))
+        self._dirty = True
+        self._unsaved += 1
+
+    def lookup(self, activity: str, tag: str) -> Optional[str]:
+        """Совет самой похожей активности с тем же тегом или None, если сходство ниже порога."""
+        text = normalize_activity(activity)
+        if not text or not self._rows:
+            self.misses += 1
+            return None
+        if self._dirty:
+            self._reweight()
+        tag_code = self._tag_ids.get(tag)
+        if tag_code is None:
+            self.misses += 1
+            return None
+
+        indices, values = self._features(text)
+        query = np.zeros(self.dim, dtype=np.float32)
+        query[indices] = values * self._idf[indices]
+        norm = np.linalg.norm(query)
+
+        # Произведение CSR-матрицы на вектор запроса; строки уже нормированы
+        scores = np.add.reduceat(query[self._indices] * self._weights, self._indptr[:-1]) / norm
+        scores[self._tag_codes != tag_code] = -1.0
+        # Точное совпадение — зона AdviceCache с его пулом вариантов, здесь только похожие
+        exact = self._keys.get((tag, text))
+        if exact is not None:
+            scores[exact] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._advice[best]
+
+    def _reweight(self) -> None:
+        """Пересчитывает IDF и нормированные веса строк по накопленным частотам."""
+        lengths = np.fromiter((len(indices) for indices, _ in self._rows), dtype=np.int64, count=len(self._rows))
+        self._indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self._indices = np.concatenate([indices for indices, _ in self._rows])
+        counts = np.concatenate([values for _, values in self._rows])
+
+        # Индексы внутри строки уникальны, поэтому bincount даёт документную частоту
+        df = np.bincount(self._indices, minlength=self.dim)
+        self._idf = (np.log((1 + len(self._rows)) / (1 + df)) + 1).astype(np.float32)
+
+        weights = counts * self._idf[self._indices]
+        norms = np.sqrt(np.add.reduceat(weights * weights, self._indptr[:-1]))
+        self._weights = weights / np.repeat(norms, lengths)
+
+        self._tag_ids = {tag: code for code, tag in enumerate(sorted(set(self._tags)))}
+        self._tag_codes = np.fromiter((self._tag_ids[tag] for tag in self._tags), dtype=np.int32, count=len(self._tags))
+        self._dirty = False
+
+    def _evict(self, count: int) -> None:
+        """Удаляет самые старые записи."""
+        self._tags = self._tags[count:]
+        self._advice = self._advice[count:]
+        self._rows = self._rows[count:]
+        self._keys = {key: row - count for key, row in self._keys.items() if row >= count}
+        self._dirty = True
+
+    def save(self) -> None:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            self._write(snapshot)
+
+    async def save_async(self) -> None:
+        """Сохраняет индекс, если он менялся; сжатие и запись идут в отдельном потоке."""
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            await asyncio.to_thread(self._write, snapshot)
+
+    def _snapshot(self) -> Optional[Dict[str, Any]]:
+        """Копия данных для записи. Снимается в потоке event loop, пока индекс не меняется."""
+        if not self.path or not self._rows or not self._unsaved:
+            return None
+        self._unsaved = 0
+        texts = [""] * len(self._rows)
+        for (_, text), row in self._keys.items():
+            texts[row] = text
+        return {
+            "lengths": [len(indices) for indices, _ in self._rows],
+            "rows": list(self._rows),
+            "texts": texts,
+            "tags": list(self._tags),
+            "advice": list(self._advice),
+        }
+
+    def _write(self, snapshot: Dict[str, Any]) -> None:
+        rows = snapshot["rows"]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Пишем во временный файл и подменяем, чтобы не оставить битый индекс при падении
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            dim=np.array(self.dim),
+            lengths=np.array(snapshot["lengths"], dtype=np.int64),
+            indices=np.concatenate([indices for indices, _ in rows]),
+            counts=np.concatenate([values for _, values in rows]),
+            texts=np.array(snapshot["texts"]),
+            tags=np.array(snapshot["tags"]),
+            advice=np.array(snapshot["advice"]),
+        )
+        os.replace(tmp_path, self.path)
+        logger.info(f"Similarity index saved: {len(rows)} activities")
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                if int(data["dim"]) != self.dim:
+                    logger.warning("Similarity index dimension changed, starting empty")
+                    return
+                offsets = np.cumsum(data["lengths"])[:-1]
+                indices = np.split(data["indices"], offsets)
+                counts = np.split(data["counts"], offsets)
+                texts, tags, advice = data["texts"].tolist(), data["tags"].tolist(), data["advice"].tolist()
+        except Exception as e:
+            logger.error(f"Failed to load similarity index: {e}")
+            return
+
+        self._keys = {(tag, text): row for row, (tag, text) in enumerate(zip(tags, texts))}
+        self._tags = tags
+        self._advice = advice
+        self._rows = list(zip(indices, counts))
+        self._dirty = True
+        logger.info(f"Similarity index loaded: {len(self._rows)} activities")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total * 100 if total else 0.0,
+        }
@@ -1,20 +1,122 @@
-from typing import Set
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from datetime import timedelta
+from functools import cached_property
+from typing import Optional, Set
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import ORMExecuteState
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.infrastructure.database.models import Base
 from app.infrastructure.database.repositories import (
+    LAST_ACTIVE_GRANULARITY,
+    StatisticsSnapshot,
     UserRepository,
     ActivityRepository,
     EventRepository,
     CheckInRepository,
 )
+from app.infrastructure.database.buffers import ActivityBuffer, CheckInBuffer
+from app.infrastructure.database.partitions import CheckInPartitions
+from app.infrastructure.database.profile_cache import UserProfile, UserProfileCache
+
+
+def _is_write(state: ORMExecuteState) -> bool:
+    """INSERT/UPDATE/DELETE, в том числе спрятанные в CTE внутри SELECT (upsert в get_or_create_user)."""
+    if not state.is_select:
+        return True
+    return any(isinstance(element, UpdateBase) for element in visitors.iterate(state.statement))
+
 
 class Database:
-    def __init__(self, session: AsyncSession, admin_ids: Set[int]):
-        self.user = UserRepository(session=session, admin_ids=admin_ids)
-        self.activity = ActivityRepository(session=session)
-        self.event = EventRepository(session=session)
-        self.checkin = CheckInRepository(session=session)
+    """
+    Доступ к репозиториям в рамках одной сессии.
+    Сессия создаётся при первом обращении к репозиторию, соединение из пула берётся
+    при первом запросе, а commit отправляется, только если в сессии что-то писали.
+    Использование: `async with Database(session_pool, admin_ids) as db: ... await db.commit()`.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        admin_ids: Set[int],
+        profiles: Optional[UserProfileCache] = None,
+        last_active_granularity: timedelta = LAST_ACTIVE_GRANULARITY,
+        statistics: Optional[StatisticsSnapshot] = None,
+    ):
+        self.session_pool = session_pool
+        self.admin_ids = admin_ids
+        self.profiles = profiles
+        self.last_active_granularity = last_active_granularity
+        self.statistics = statistics
+        self.wrote = False
+
+    async def __aenter__(self) -> "Database":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    @cached_property
+    def session(self) -> AsyncSession:
+        session = self.session_pool()
+        event.listen(session.sync_session, "do_orm_execute", self._on_execute)
+        event.listen(session.sync_session, "after_flush", self._on_flush)
+        return session
+
+    @cached_property
+    def user(self) -> UserRepository:
+        return UserRepository(
+            session=self.session,
+            admin_ids=self.admin_ids,
+            profiles=self.profiles,
+            last_active_granularity=self.last_active_granularity,
+            statistics=self.statistics,
+        )
+
+    @cached_property
+    def activity(self) -> ActivityRepository:
+        return ActivityRepository(session=self.session)
+
+    @cached_property
+    def event(self) -> EventRepository:
+        return EventRepository(session=self.session)
+
+    @cached_property
+    def checkin(self) -> CheckInRepository:
+        return CheckInRepository(session=self.session)
+
+    def _on_execute(self, state: ORMExecuteState) -> None:
+        if not self.wrote and _is_write(state):
+            self.wrote = True
+
+    def _on_flush(self, session, flush_context) -> None:
+        self.wrote = True
+
+    @property
+    def started(self) -> bool:
+        return "session" in self.__dict__
+
+    async def commit(self) -> None:
+        """Коммитит, если в сессии были записи; иначе ничего не отправляет в БД."""
+        if not self.started:
+            return
+        session = self.session
+        if self.wrote or session.new or session.dirty or session.deleted:
+            await session.commit()
+            self.wrote = False
+
+    async def rollback(self) -> None:
+        if self.started:
+            await self.session.rollback()
+            self.wrote = False
+
+    async def close(self) -> None:
+        if self.started:
+            await self.session.close()
+            del self.__dict__["session"]
+            for name in ("user", "activity", "event", "checkin"):
+                self.__dict__.pop(name, None)
 
 async def create_tables(engine: AsyncEngine):
     """Создает все таблицы в базе данных"""
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime as dt, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.infrastructure.database.repositories import ActivityRepository, CheckInRepository
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBackoff:
+    """Пауза между сбросами буфера: `interval`, а после ошибок — экспоненциально дольше."""
+
+    def __init__(self, interval: float, max_delay: float = 60.0):
+        self.interval = interval
+        self.max_delay = max(max_delay, interval)
+        self.failures = 0
+
+    @property
+    def delay(self) -> float:
+        return min(self.interval * 2 ** self.failures, self.max_delay)
+
+    def failed(self) -> None:
+        self.failures += 1
+
+    def succeeded(self) -> None:
+        self.failures = 0
+
+
+class ActivityBuffer:
+    """
+    Write-behind буфер счётчиков активности.
+    Мидлварь только увеличивает счётчик в памяти; раз в `interval` секунд накопленное
+    записывается в activities одним многострочным upsert. При ошибке записи счётчики
+    возвращаются в буфер, а следующая попытка откладывается всё дольше.
+    Буфер держит не больше `max_keys` пар (пользователь, день): пока БД недоступна,
+    счётчики новых пар отбрасываются — это статистика, а не данные пользователя.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        interval: float = 5.0,
+        max_keys: int = 100_000,
+    ):
+        self.session_pool = session_pool
+        self.interval = interval
+        self.max_keys = max_keys
+        self.dropped = 0
+        self._backoff = RetryBackoff(interval)
+        self._counts: Counter[Tuple[int, date]] = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def add(self, user_id: int, actions: int = 1) -> None:
+        key = (user_id, dt.now(ZoneInfo("Europe/Moscow")).date())
+        if key not in self._counts and len(self._counts) >= self.max_keys:
+            self.dropped += actions
+            return
+        self._counts[key] += actions
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="activity-buffer")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._backoff.delay)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Записывает накопленные счётчики. Возвращает число записанных строк (user, день)."""
+        async with self._lock:
+            if not self._counts:
+                return 0
+            counts, self._counts = self._counts, Counter()
+            try:
+                async with self.session_pool() as session:
+                    await ActivityRepository(session=session).add_activities_bulk(counts)
+                    await session.commit()
+            except Exception as e:
+                # Не теряем счётчики: вернём их в буфер к тем, что успели накопиться
+                self._counts.update(counts)
+                self._backoff.failed()
+                logger.error(
+                    f"Failed to flush activity buffer ({len(counts)} rows, "
+                    f"retry in {self._backoff.delay:.0f}s, {self.dropped} actions dropped): {e}"
+                )
+                return 0
+            self._backoff.succeeded()
+            if self.dropped:
+                logger.warning(f"Activity buffer was full, dropped {self.dropped} actions")
+                self.dropped = 0
+            return len(counts)
+
+
+CheckInRow = Tuple[int, str, Dict[str, Any], dt]
+
+
+class CheckInBuffer:
+    """
+    Очередь записи чекинов.
+    Хендлер кладёт чекин в память и сразу отвечает пользователю; раз в `interval` секунд
+    или при накоплении `batch_size` строк очередь пишется в checkins многострочными INSERT,
+    каждая пачка в своей транзакции. Время чекина фиксируется при добавлении.
+    В памяти держится не больше `max_pending` строк: лишние, а также всё, что не удалось
+    записать при остановке, дописываются в `spill_path` (JSONL) и возвращаются в очередь,
+    когда в ней появляется место. Пока БД недоступна, попытки записи реже и реже.
+    Пачка, которую БД отвергла из-за данных, делится пополам, пока плохие строки не будут
+    найдены; они откладываются в `<spill_path>.rejected` и очередь не держат.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        interval: float = 1.0,
+        batch_size: int = 500,
+        spill_path: Optional[str] = None,
+        max_pending: int = 10_000,
+    ):
+        self.session_pool = session_pool
+        self.interval = interval
+        self.batch_size = batch_size
+        self.spill_path = spill_path
+        self.max_pending = max(max_pending, batch_size)
+        self._backoff = RetryBackoff(interval)
+        self._rows: List[CheckInRow] = []
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, user_id: int, check_in_type: str, data: Dict[str, Any]) -> None:
+        row = (user_id, check_in_type, data, dt.now(timezone.utc))
+        if len(self._rows) >= self.max_pending:
+            self._spill([row])
+            return
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._full.set()
+
+    async def start(self) -> None:
+        self._load_spill()
+        if self._rows:
+            await self.flush()
+        self._task = asyncio.create_task(self._run(), name="checkin-buffer")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._rows:
+            self._spill(self._rows)
+            if self.spill_path:
+                logger.warning(f"Saved {len(self._rows)} pending check-ins to {self.spill_path}")
+            self._rows = []
+
+    async def _run(self) -> None:
+        while True:
+            if self._backoff.failures:
+                # БД недоступна: не спешим, даже если очередь заполнилась
+                await asyncio.sleep(self._backoff.delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Записывает накопленные чекины. Возвращает число записанных строк."""
+        async with self._lock:
+            self._full.clear()
+            if not self._rows:
+                return 0
+            rows, self._rows = self._rows, []
+            try:
+                written = await self._write(rows)
+            except Exception as e:
+                self._backoff.failed()
+                if len(self._rows) > self.max_pending:
+                    # Новые строки, пришедшие за время записи, не помещаются — на диск
+                    self._spill(self._rows[self.max_pending:])
+                    del self._rows[self.max_pending:]
+                logger.error(
+                    f"Failed to flush check-in buffer ({len(self._rows)} rows pending, "
+                    f"retry in {self._backoff.delay:.0f}s): {e}"
+                )
+                return 0
+            self._backoff.succeeded()
+            self._load_spill()
+            return written
+
+    async def _write(self, rows: List[CheckInRow]) -> int:
+        """
+        Пишет строки пачками по `batch_size`. Пачку с ошибкой в данных делит пополам,
+        одиночную плохую строку откладывает. При любой другой ошибке возвращает
+        незаписанный остаток в начало очереди и пробрасывает ошибку.
+        """
+        written = 0
+        # Стек диапазонов: сверху всегда самый левый, всё левее него уже обработано
+        ranges = [(start, min(start + self.batch_size, len(rows))) for start in range(0, len(rows), self.batch_size)]
+        ranges.reverse()
+        while ranges:
+            start, end = ranges.pop()
+            try:
+                async with self.session_pool() as session:
+                    await CheckInRepository(session=session).save_check_ins_bulk(rows[start:end], chunk_size=self.batch_size)
+                    await session.commit()
+            except (DataError, IntegrityError) as e:
+                if end - start == 1:
+                    self._reject(rows[start], e)
+                else:
+                    middle = (start + end) // 2
+                    ranges += [(middle, end), (start, middle)]
+                continue
+            except Exception:
+                self._rows[:0] = rows[start:]
+                raise
+            written += end - start
+        return written
+
+    def _reject(self, row: CheckInRow, error: Exception) -> None:
+        logger.error(f"Check-in of user {row[0]} rejected by the database: {error}")
+        if not self.spill_path:
+            return
+        with open(f"{self.spill_path}.rejected", "a", encoding="utf-8") as file:
+            file.write(json.dumps({**dump_row(row), "error": str(error)}, ensure_ascii=False) + "\n")
+
+    def _spill(self, rows: List[CheckInRow]) -> None:
+        if not self.spill_path:
+            logger.error(f"Lost {len(rows)} check-ins: database unavailable and no spill path")
+            return
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(dump_row(row), ensure_ascii=False) + "\n")
+
+    def _load_spill(self) -> None:
+        """Возвращает в начало очереди столько строк из `spill_path`, сколько в ней есть места."""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        room = self.max_pending - len(self._rows)
+        if room <= 0:
+            return
+        with open(self.spill_path, encoding="utf-8") as file:
+            lines = [line for line in file if line.strip()]
+        rows = [load_row(json.loads(line)) for line in lines[:room]]
+        rest = lines[room:]
+        if rest:
+            tmp_path = f"{self.spill_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.writelines(rest)
+            os.replace(tmp_path, self.spill_path)
+        else:
+            os.remove(self.spill_path)
+        self._rows[:0] = rows
+        if len(self._rows) >= self.batch_size:
+            self._full.set()
+        logger.info(f"Loaded {len(rows)} pending check-ins from {self.spill_path}, {len(rest)} left on disk")
+
+
+def dump_row(row: CheckInRow) -> Dict[str, Any]:
+    user_id, check_in_type, data, timestamp = row
+    return {"user_id": user_id, "check_in_type": check_in_type, "data": data, "timestamp": timestamp.isoformat()}
+
+
+def load_row(item: Dict[str, Any]) -> CheckInRow:
+    return item["user_id"], item["check_in_type"], item["data"], dt.fromisoformat(item["timestamp"])
@@ -1,5 +1,6 @@
 from .base import Base, uniq_str_an, uniq_int_an, not_null_str
 from .user import User
 from .checkin import CheckIn
-from .event import Event
-from .activity import Activity
\ No newline at end of file
+from .event import Event, MAX_ADVICE_ATTEMPTS
+from .activity import Activity
+from .activity_rollup import ActivityRollup
\ No newline at end of file
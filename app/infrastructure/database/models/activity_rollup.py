@@ -0,0 +1,42 @@
+from datetime import date
+from sqlalchemy import (
+    text,
+    BigInteger,
+    Integer,
+    ForeignKey,
+    Date,
+    Index,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class ActivityRollup(Base):
+    """
+    Итоги активности пользователя: за всё время и за скользящие 7 и 30 дней.
+    Счётчики увеличиваются при сбросе буфера активности, окна пересчитываются
+    раз в сутки относительно window_date.
+    """
+    __tablename__ = "activity_rollups"
+
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey('users.user_id', ondelete="CASCADE"),
+        unique=True,
+        nullable=False,
+    )
+    
+    total: Mapped[int] = mapped_column(BigInteger, server_default=text("0"), nullable=False)
+    last_7d: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    last_30d: Mapped[int] = mapped_column(Integer, server_default=text("0"), nullable=False)
+    
+    # День, на который посчитаны окна last_7d и last_30d
+    window_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    __table_args__ = (
+        # Топ-N для /active: обратный проход по индексу без сортировки
+        Index("ix_activity_rollups_total", "total"),
+        Index("ix_activity_rollups_last_7d", "last_7d"),
+        Index("ix_activity_rollups_last_30d", "last_30d"),
+    )
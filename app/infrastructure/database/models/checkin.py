@@ -4,6 +4,7 @@ from typing import TYPE_CHECKING, Dict, Any
 from sqlalchemy import (
     BigInteger,
     ForeignKey,
+    Index,
     String,
     TIMESTAMP,
     func
@@ -18,7 +19,11 @@ if TYPE_CHECKING:
 
 
 class CheckIn(Base):
-    """Модель чекина."""
+    """
+    Модель чекина.
+    Таблица секционирована по месяцам по `timestamp` (см. CheckInPartitions),
+    поэтому timestamp входит в первичный ключ.
+    """
 
     user_id: Mapped[int] = mapped_column(
         BigInteger,
@@ -28,7 +33,8 @@ class CheckIn(Base):
     
     timestamp: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
-        server_default=func.now()
+        server_default=func.now(),
+        primary_key=True,
     )
     
     check_in_type: Mapped[str] = mapped_column(String, nullable=False)
@@ -39,4 +45,9 @@ class CheckIn(Base):
     user: Mapped["User"] = relationship(
         "User",
         back_populates="check_ins",
-    )
\ No newline at end of file
+    )
+
+    __table_args__ = (
+        Index("ix_checkins_user_id_timestamp", "user_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
@@ -1,10 +1,12 @@
 from datetime import time, date
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy import (
     BigInteger,
     ForeignKey,
     Date,
+    Index,
+    SmallInteger,
     String,
     Time,
     text
@@ -16,6 +18,9 @@ from .base import Base
 if TYPE_CHECKING:
     from .user import User
 
+# После стольких неудачных попыток совет для события больше не запрашивается
+MAX_ADVICE_ATTEMPTS = 3
+
 
 class Event(Base):
     """Модель события (элемента рутины)."""
@@ -33,6 +38,15 @@ class Event(Base):
     end_time: Mapped[time] = mapped_column(Time, nullable=False)
     tag: Mapped[str] = mapped_column(String, nullable=False)
     
+    # Совет ИИ, подготовленный заранее, чтобы не ждать модель в момент напоминания
+    advice: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    advice_attempts: Mapped[int] = mapped_column(
+        SmallInteger,
+        default=0,
+        server_default=text("0"),
+        nullable=False,
+    )
+    
     status: Mapped[str] = mapped_column(
         String,
         default='pending',
@@ -42,4 +56,13 @@ class Event(Base):
     user: Mapped["User"] = relationship(
         "User",
         back_populates="events",
+    )
+
+    __table_args__ = (
+        Index("ix_events_event_date_start_time", "event_date", "start_time"),
+        Index("ix_events_user_id_event_date_start_time", "user_id", "event_date", "start_time"),
+        Index(
+            "ix_events_pending_advice", "event_date", "start_time",
+            postgresql_where=text(f"advice IS NULL AND advice_attempts < {MAX_ADVICE_ATTEMPTS}"),
+        ),
     )
\ No newline at end of file
@@ -7,7 +7,7 @@ from sqlalchemy import (
     TIMESTAMP,
     BigInteger,
     Boolean,
-    
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -38,6 +38,12 @@ class User(Base):
         server_default=text("'False'")
     )
     
+    banned: Mapped[bool] = mapped_column(
+        Boolean,
+        default=False,
+        server_default=text("'False'")
+    )
+    
     last_active: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
         server_default=func.now(),
@@ -62,3 +68,11 @@ class User(Base):
         cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_users_last_active", "last_active"),
+        Index(
+            "ix_users_audience", "user_id",
+            postgresql_where=text("notifications_enabled"),
+            postgresql_include=["last_active"],
+        ),
+    )
@@ -0,0 +1,196 @@
+import asyncio
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime as dt, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME = re.compile(r"^checkins_y(\d{4})m(\d{2})$")
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"checkins_y{month.year}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+class CheckInPartitions:
+    """
+    Обслуживание помесячных секций checkins (границы по UTC).
+    `maintain` создаёт секции на `months_ahead` месяцев вперёд, отсоединяет секции старше
+    `retention_months`, выгружает их в `archive_dir` как csv.gz и удаляет.
+    Отсоединённая, но ещё не выгруженная секция доделывается при следующем запуске.
+    Строки будущего месяца, попавшие в секцию по умолчанию (checkins_default) до создания
+    его секции, переносятся в неё. Строки старше срока хранения в checkins_default
+    выгружаются в отдельный архив и удаляются из неё.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        archive_dir: str,
+        retention_months: int = 12,
+        months_ahead: int = 3,
+    ):
+        self.session_pool = session_pool
+        self.archive_dir = archive_dir
+        self.retention_months = retention_months
+        self.months_ahead = months_ahead
+
+    async def maintain(self) -> None:
+        current = dt.now(timezone.utc).date().replace(day=1)
+        await self.create_ahead(current)
+        await self.detach_expired(current)
+        for name in await self._get_detached():
+            await self.archive(name)
+        await self.archive_default(add_months(current, -self.retention_months))
+
+    async def create_ahead(self, current: date) -> None:
+        for offset in range(self.months_ahead + 1):
+            month = add_months(current, offset)
+            try:
+                await self.create(month)
+            except Exception as e:
+                # Например, не дождались блокировки: повторим при следующем запуске
+                logger.error(f"Failed to create check-in partition {partition_name(month)}: {e}")
+
+    async def create(self, month: date) -> None:
+        """
+        Создаёт секцию месяца. Postgres не создаст её, пока в checkins_default есть строки
+        этого месяца, поэтому они переносятся в новую секцию в той же транзакции.
+        """
+        name = partition_name(month)
+        # Границы секций не параметризуются в DDL, поэтому подставляются как литералы
+        start = f"'{month.isoformat()} 00:00+00'"
+        end = f"'{add_months(month, 1).isoformat()} 00:00+00'"
+        in_month = f"timestamp >= {start} AND timestamp < {end}"
+        async with self.session_pool() as session:
+            if await session.scalar(text(f"SELECT to_regclass('{name}') IS NOT NULL")):
+                return
+            stray = await session.scalar(text(f"SELECT EXISTS (SELECT 1 FROM checkins_default WHERE {in_month})"))
+            if stray:
+                await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+                # Родитель блокируется первым, как при вставке, чтобы не встать в дедлок со вставками
+                await session.execute(text("LOCK TABLE ONLY checkins IN ACCESS EXCLUSIVE MODE"))
+                await session.execute(text("LOCK TABLE checkins_default IN ACCESS EXCLUSIVE MODE"))
+                await session.execute(text("CREATE TEMP TABLE stray_checkins (LIKE checkins) ON COMMIT DROP"))
+                await session.execute(text(
+                    f"WITH moved AS (DELETE FROM checkins_default WHERE {in_month} RETURNING *) "
+                    f"INSERT INTO stray_checkins SELECT * FROM moved"
+                ))
+            await session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF checkins FOR VALUES FROM ({start}) TO ({end})"
+            ))
+            if stray:
+                moved = await session.execute(text("INSERT INTO checkins SELECT * FROM stray_checkins"))
+                logger.warning(f"Moved {moved.rowcount} rows from checkins_default to {name}")
+            await session.commit()
+
+    async def detach_expired(self, current: date) -> List[str]:
+        cutoff = add_months(current, -self.retention_months)
+        detached = []
+        for name in await self._get_attached():
+            month = partition_month(name)
+            if month is None or add_months(month, 1) > cutoff:
+                continue
+            try:
+                async with self.session_pool() as session:
+                    # Отсоединение берёт эксклюзивную блокировку checkins: не ждём её дольше,
+                    # чем готовы задерживать вставки, и повторим при следующем запуске
+                    await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+                    await session.execute(text(f"ALTER TABLE checkins DETACH PARTITION {name}"))
+                    await session.commit()
+            except Exception as e:
+                logger.error(f"Failed to detach check-in partition {name}: {e}")
+                continue
+            detached.append(name)
+            logger.info(f"Detached check-in partition {name}")
+        return detached
+
+    async def archive(self, name: str) -> str:
+        """Выгружает отсоединённую секцию в `archive_dir`/<name>.csv.gz и удаляет таблицу."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{name}.csv.gz")
+        tmp_path = f"{path}.tmp"
+
+        async with self.session_pool() as session:
+            connection = await session.connection()
+            raw = await connection.get_raw_connection()
+            with gzip.open(tmp_path, "wb") as archive:
+                async def write(chunk: bytes) -> None:
+                    # Сжатие в потоке, чтобы не останавливать event loop на больших секциях
+                    await asyncio.to_thread(archive.write, chunk)
+
+                await raw.driver_connection.copy_from_table(name, output=write, format="csv", header=True)
+            os.replace(tmp_path, path)
+
+            await session.execute(text(f"DROP TABLE {name}"))
+            await session.commit()
+        logger.info(f"Archived check-in partition {name} to {path}")
+        return path
+
+    async def archive_default(self, cutoff: date) -> Optional[str]:
+        """Выгружает строки checkins_default старше `cutoff` в csv.gz и удаляет их."""
+        bound = f"{cutoff.isoformat()} 00:00+00"
+        async with self.session_pool() as session:
+            expired = await session.scalar(text(
+                f"SELECT EXISTS (SELECT 1 FROM checkins_default WHERE timestamp < '{bound}')"
+            ))
+            if not expired:
+                return None
+
+            os.makedirs(self.archive_dir, exist_ok=True)
+            # Время выгрузки в имени: поздние строки той же границы не перезапишут прошлый архив
+            path = os.path.join(self.archive_dir, f"checkins_default_{dt.now(timezone.utc):%Y%m%dT%H%M%S}.csv.gz")
+            tmp_path = f"{path}.tmp"
+            # Выгрузка и удаление в одной транзакции: удаляются ровно выгруженные строки
+            await session.execute(text("LOCK TABLE checkins_default IN SHARE ROW EXCLUSIVE MODE"))
+            connection = await session.connection()
+            raw = await connection.get_raw_connection()
+            with gzip.open(tmp_path, "wb") as archive:
+                async def write(chunk: bytes) -> None:
+                    await asyncio.to_thread(archive.write, chunk)
+
+                await raw.driver_connection.copy_from_query(
+                    f"SELECT * FROM checkins_default WHERE timestamp < '{bound}'",
+                    output=write, format="csv", header=True,
+                )
+            os.replace(tmp_path, path)
+
+            await session.execute(text(f"DELETE FROM checkins_default WHERE timestamp < '{bound}'"))
+            await session.commit()
+        logger.info(f"Archived expired rows of checkins_default to {path}")
+        return path
+
+    async def _get_attached(self) -> List[str]:
+        async with self.session_pool() as session:
+            result = await session.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'checkins'::regclass ORDER BY c.relname"
+            ))
+            return list(result.scalars())
+
+    async def _get_detached(self) -> List[str]:
+        async with self.session_pool() as session:
+            result = await session.execute(text(
+                "SELECT relname FROM pg_class "
+                "WHERE relkind = 'r' AND NOT relispartition AND relname ~ '^checkins_y[0-9]{4}m[0-9]{2}$' "
+                "ORDER BY relname"
+            ))
+            return list(result.scalars())
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, NamedTuple, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.enums import UserRole
+
+logger = logging.getLogger(__name__)
+
+# Ключ в session.info: пользователи, профиль которых изменён в текущей транзакции
+DIRTY_PROFILES = "dirty_user_profiles"
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    role: UserRole
+    notifications_enabled: bool
+    onboarding_completed: bool
+    banned: bool
+
+
+class ProfileVersion(NamedTuple):
+    """Состояние кэша на момент промаха: локальные часы сбросов и версия профиля в Redis."""
+    epoch: int
+    shared: Optional[str]
+
+
+# Пишет хэш профиля, только если его версия не менялась с момента промаха
+SET_IF_VERSION = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'role', ARGV[2], 'notifications_enabled', ARGV[3], 'onboarding_completed', ARGV[4], 'banned', ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return 1
+"""
+
+
+def mark_profiles_dirty(session: Session, user_ids: Iterable[int]) -> None:
+    """Отмечает профили изменёнными; кэш сбрасывается после коммита транзакции."""
+    session.info.setdefault(DIRTY_PROFILES, set()).update(user_ids)
+
+
+def dirty_profiles(session: Session) -> Set[int]:
+    return session.info.get(DIRTY_PROFILES, set())
+
+
+class UserProfileCache:
+    """
+    Кэш профилей пользователей (роль, уведомления, онбординг, бан): LRU с TTL в памяти
+    процесса перед хэшами в Redis.
+    Записи в UserRepository отмечают профиль в session.info; после коммита запись
+    удаляется локально и в Redis, а id публикуется в канал, чтобы другие реплики
+    сбросили свои локальные копии.
+    Сброс также увеличивает версию профиля в Redis. Профиль, прочитанный из БД после
+    промаха, записывается в Redis скриптом, только если версия с момента промаха не
+    изменилась, иначе реплика с устаревшим чтением могла бы вернуть его в общий кэш.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        ttl: int = 10 * 60,
+        local_ttl: int = 30,
+        max_size: int = 10_000,
+        prefix: str = "user:profile:",
+        channel: str = "user:profile:invalidate",
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_size = max_size
+        self.prefix = prefix
+        self.channel = channel
+        self.hits = 0
+        self.misses = 0
+        # Часы сбросов: растут при каждом сбросе, `_dropped` помнит, когда сбрасывали профиль.
+        # Профиль, прочитанный из БД до сброса этого же пользователя, в кэш не кладём.
+        # Из `_dropped` вытесняются самые старые записи, `_dropped_floor` — время последней
+        # вытесненной: чтения старше него считаются устаревшими для всех
+        self.epoch = 0
+        self._dropped: OrderedDict[int, int] = OrderedDict()
+        self._dropped_floor = 0
+        self._local: OrderedDict[int, Tuple[float, UserProfile]] = OrderedDict()
+        self._listener: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+        self._set_script = redis.register_script(SET_IF_VERSION) if redis is not None else None
+
+    async def start(self) -> None:
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+        if self.redis is not None:
+            self._listener = asyncio.create_task(self._listen(), name="profile-invalidations")
+
+    async def close(self) -> None:
+        event.remove(Session, "after_commit", self._after_commit)
+        event.remove(Session, "after_rollback", self._after_rollback)
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def get(self, user_id: int) -> Tuple[Optional[UserProfile], ProfileVersion]:
+        """
+        Профиль из кэша или None. Версию, полученную вместе с промахом, нужно передать
+        в `set` после чтения профиля из БД.
+        """
+        version = ProfileVersion(self.epoch, None)
+        entry = self._local.get(user_id)
+        if entry is not None and entry[0] >= time.monotonic():
+            self._local.move_to_end(user_id)
+            self.hits += 1
+            return entry[1], version
+
+        profile, shared = await self._get_shared(user_id)
+        version = version._replace(shared=shared)
+        if profile is None:
+            self.misses += 1
+            return None, version
+        self.hits += 1
+        self._set_local(user_id, profile)
+        return profile, version
+
+    async def set(self, user_id: int, profile: UserProfile, version: ProfileVersion) -> None:
+        """Кладёт профиль в кэш, если с момента промаха (`version`) профиль не сбрасывали."""
+        if version.epoch < max(self._dropped.get(user_id, 0), self._dropped_floor):
+            return
+        self._set_local(user_id, profile)
+        if self._set_script is None or version.shared is None:
+            return
+        try:
+            await self._set_script(
+                keys=[self.prefix + str(user_id), self._version_key(user_id)],
+                args=[
+                    version.shared,
+                    profile.role.name,
+                    int(profile.notifications_enabled),
+                    int(profile.onboarding_completed),
+                    int(profile.banned),
+                    self.ttl,
+                ],
+            )
+        except Exception as e:
+            logger.warning(f"Profile cache write failed ({type(e).__name__})")
+
+    async def invalidate(self, user_ids: Iterable[int]) -> None:
+        user_ids = list(user_ids)
+        self._drop_local(user_ids)
+        if self.redis is None or not user_ids:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for user_id in user_ids:
+                    pipe.incr(self._version_key(user_id))
+                    pipe.expire(self._version_key(user_id), self.ttl)
+                pipe.delete(*(self.prefix + str(user_id) for user_id in user_ids))
+                pipe.publish(self.channel, ",".join(map(str, user_ids)))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Profile cache invalidation failed ({type(e).__name__})")
+
+    def _after_commit(self, session: Session) -> None:
+        user_ids = session.info.pop(DIRTY_PROFILES, None)
+        if not user_ids:
+            return
+        # Локальная копия сбрасывается сразу, Redis и другие реплики — в фоне
+        self._drop_local(user_ids)
+        task = asyncio.get_running_loop().create_task(self.invalidate(user_ids))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop(DIRTY_PROFILES, None)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        data = message["data"]
+                        data = data.decode() if isinstance(data, bytes) else data
+                        self._drop_local(int(user_id) for user_id in data.split(","))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Пока подписки нет, чужие изменения доживают максимум local_ttl
+                logger.warning(f"Profile invalidation listener failed ({type(e).__name__}), retrying")
+                await asyncio.sleep(5)
+
+    def _drop_local(self, user_ids: Iterable[int]) -> None:
+        self.epoch += 1
+        for user_id in user_ids:
+            self._local.pop(user_id, None)
+            self._dropped[user_id] = self.epoch
+            self._dropped.move_to_end(user_id)
+        while len(self._dropped) > self.max_size:
+            _, self._dropped_floor = self._dropped.popitem(last=False)
+
+    def _set_local(self, user_id: int, profile: UserProfile) -> None:
+        self._local[user_id] = (time.monotonic() + self.local_ttl, profile)
+        self._local.move_to_end(user_id)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{self.prefix}version:{user_id}"
+
+    async def _get_shared(self, user_id: int) -> Tuple[Optional[UserProfile], Optional[str]]:
+        """Профиль из Redis и текущая версия профиля ("0", если сбросов не было)."""
+        if self.redis is None:
+            return None, None
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(self.prefix + str(user_id))
+                pipe.get(self._version_key(user_id))
+                raw, shared = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Profile cache read failed ({type(e).__name__})")
+            return None, None
+        shared = shared.decode() if isinstance(shared, bytes) else (shared or "0")
+        if not raw:
+            return None, shared
+        data = {
+            (key.decode() if isinstance(key, bytes) else key): (value.decode() if isinstance(value, bytes) else value)
+            for key, value in raw.items()
+        }
+        try:
+            profile = UserProfile(
+                role=UserRole[data["role"]],
+                notifications_enabled=data["notifications_enabled"] == "1",
+                onboarding_completed=data["onboarding_completed"] == "1",
+                banned=data["banned"] == "1",
+            )
+        except (KeyError, ValueError):
+            return None, shared
+        return profile, shared
@@ -1,4 +1,4 @@
-from .user import UserRepository
+from .user import LAST_ACTIVE_GRANULARITY, StatisticsSnapshot, UserRepository
 from .activity import ActivityRepository
 from .event import EventRepository
 from .checkin import CheckInRepository
\ No newline at end of file
@@ -1,36 +1,124 @@
-from typing import List, Any, Optional
+from datetime import date, datetime as dt, timedelta
+from typing import List, Any, Mapping, Tuple
+from zoneinfo import ZoneInfo
 
-from sqlalchemy import select, func, desc
+from sqlalchemy import BigInteger, Date, Integer, column, literal, select, func, update, values
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.infrastructure.database.models import Activity
+from app.infrastructure.database.models import Activity, ActivityRollup, User
+
+# Advisory-блокировка activity_rollups: сбросы буфера берут её разделяемой, пересчёт окон —
+# эксклюзивной, чтобы пересчёт не затирал прибавки, которых нет в его снимке
+ROLLUP_LOCK_ID = 0x5EC0_11A9
+
+# Окна лидерборда /active и их колонки в activity_rollups
+WINDOWS = {
+    "7d": ActivityRollup.last_7d,
+    "30d": ActivityRollup.last_30d,
+    "all": ActivityRollup.total,
+}
 
 class ActivityRepository:
     def __init__(self, session: AsyncSession):
         self._session = session
         
     async def add_user_activity(self, user_id: int) -> None:
-        stmt = (
-            pg_insert(Activity)
-            .values(user_id=user_id)
-            .on_conflict_do_update(
+        today = dt.now(ZoneInfo("Europe/Moscow")).date()
+        await self.add_activities_bulk({(user_id, today): 1})
+    
+    async def add_activities_bulk(self, counts: Mapping[Tuple[int, date], int], chunk_size: int = 1000) -> None:
+        """
+        Прибавляет накопленные счётчики {(user_id, дата): действия} многострочным upsert.
+        Строки без пользователя в users отбрасываются join-ом, чтобы не падать на внешнем ключе.
+        Тем же батчем увеличиваются итоги в activity_rollups.
+        """
+        today = dt.now(ZoneInfo("Europe/Moscow")).date()
+        await self._session.execute(select(func.pg_advisory_xact_lock_shared(ROLLUP_LOCK_ID)))
+        rows = [(user_id, day, actions) for (user_id, day), actions in counts.items()]
+        for start in range(0, len(rows), chunk_size):
+            batch = values(
+                column("user_id", BigInteger),
+                column("activity_date", Date),
+                column("actions", Integer),
+                name="batch",
+            ).data(rows[start:start + chunk_size])
+            source = (
+                select(batch.c.user_id, batch.c.activity_date, batch.c.actions)
+                .join(User, User.user_id == batch.c.user_id)
+            )
+            stmt = pg_insert(Activity).from_select(["user_id", "activity_date", "actions"], source)
+            stmt = stmt.on_conflict_do_update(
                 index_elements=["user_id", "activity_date"],
-                set_={'actions': Activity.actions + 1}
+                set_={"actions": Activity.actions + stmt.excluded.actions},
             )
+            await self._session.execute(stmt)
+            await self._add_to_rollups(source.subquery(), today)
+
+    async def _add_to_rollups(self, source, today: date) -> None:
+        window_sums = [
+            func.coalesce(func.sum(source.c.actions).filter(source.c.activity_date > today - timedelta(days=days)), 0)
+            for days in (7, 30)
+        ]
+        totals = select(
+            source.c.user_id,
+            func.sum(source.c.actions),
+            *window_sums,
+            literal(today, Date),
+        ).group_by(source.c.user_id)
+        stmt = pg_insert(ActivityRollup).from_select(["user_id", "total", "last_7d", "last_30d", "window_date"], totals)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                "total": ActivityRollup.total + stmt.excluded.total,
+                "last_7d": ActivityRollup.last_7d + stmt.excluded.last_7d,
+                "last_30d": ActivityRollup.last_30d + stmt.excluded.last_30d,
+            },
         )
         await self._session.execute(stmt)
+
+    async def roll_windows(self, today: date) -> int:
+        """
+        Пересчитывает окна 7/30 дней на дату `today` по последним 30 дням activities.
+        Идемпотентно: строки, уже посчитанные на `today`, не трогаются.
+        Строки без активности за 30 дней пропускаются — их окна и так нулевые.
+        Блокировка ждёт незакоммиченные сбросы буфера, поэтому их прибавки уже видны в activities.
+        """
+        await self._session.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_ID)))
+        def window_sum(days: int):
+            return func.coalesce(
+                select(func.sum(Activity.actions))
+                .where(
+                    Activity.user_id == ActivityRollup.user_id,
+                    Activity.activity_date > today - timedelta(days=days),
+                )
+                .scalar_subquery(),
+                0,
+            )
+
+        stmt = (
+            update(ActivityRollup)
+            .where(ActivityRollup.window_date < today, ActivityRollup.last_30d > 0)
+            .values(last_7d=window_sum(7), last_30d=window_sum(30), window_date=today)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self._session.execute(stmt)
+        return result.rowcount
         
-    async def get_statistics(self) -> Optional[List[tuple[Any, ...]]]:
+    async def get_statistics(self, window: str = "all", limit: int = 5) -> List[tuple[Any, ...]]:
+        """Топ пользователей по действиям за окно из WINDOWS ("7d", "30d", "all")."""
+        actions = WINDOWS[window]
         stmt = (
-            select(Activity.user_id, func.sum(Activity.actions).label("total"))
-            .group_by(Activity.user_id)
-            .order_by(desc("total"))
-            .limit(5)
+            select(ActivityRollup.user_id, actions)
+            .where(actions > 0)
+            .order_by(actions.desc())
+            .limit(limit)
         )
         result = await self._session.execute(stmt)
         return result.all()
     
 """
 add_user_activity
+add_activities_bulk
+roll_windows
 get_statistics
 """
\ No newline at end of file
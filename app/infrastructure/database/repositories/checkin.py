@@ -1,8 +1,11 @@
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, Sequence, Tuple
 
+from sqlalchemy import BigInteger, String, TIMESTAMP, column, insert, select, values
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.infrastructure.database.models import CheckIn
+from app.infrastructure.database.models import CheckIn, User
 
 
 class CheckInRepository:
@@ -17,4 +20,24 @@ class CheckInRepository:
             data=data
         )
         self._session.add(check_in)
-        await self._session.flush()
\ No newline at end of file
+        await self._session.flush()
+
+    async def save_check_ins_bulk(self, rows: Sequence[Tuple[int, str, Dict[str, Any], datetime]], chunk_size: int = 1000) -> None:
+        """
+        Сохраняет чекины (user_id, тип, данные, время) многострочным INSERT.
+        Строки без пользователя в users отбрасываются join-ом, чтобы не падать на внешнем ключе.
+        """
+        for start in range(0, len(rows), chunk_size):
+            batch = values(
+                column("user_id", BigInteger),
+                column("check_in_type", String),
+                column("data", JSONB),
+                column("timestamp", TIMESTAMP(timezone=True)),
+                name="batch",
+            ).data(list(rows[start:start + chunk_size]))
+            source = (
+                select(batch.c.user_id, batch.c.check_in_type, batch.c.data, batch.c.timestamp)
+                .join(User, User.user_id == batch.c.user_id)
+            )
+            stmt = insert(CheckIn).from_select(["user_id", "check_in_type", "data", "timestamp"], source)
+            await self._session.execute(stmt)
@@ -1,13 +1,28 @@
 import time
 import random
-from datetime import datetime as dt, date
+from datetime import datetime as dt, date, time as dt_time, timedelta
 from zoneinfo import ZoneInfo
-from typing import List, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 
-from sqlalchemy import select, delete, and_
+from sqlalchemy import Row, String, cast, insert, literal, select, delete, update, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.infrastructure.database.models import Event
+from app.infrastructure.database.models import Event, User, MAX_ADVICE_ATTEMPTS
+
+
+def _starts_between(start: dt, end: dt):
+    """Условие "событие начинается в [start, end)" с учетом перехода через полночь."""
+    conditions = []
+    day = start.date()
+    while day <= end.date():
+        day_conditions = [Event.event_date == day]
+        if day == start.date():
+            day_conditions.append(Event.start_time >= start.time())
+        if day == end.date():
+            day_conditions.append(Event.start_time < end.time())
+        conditions.append(and_(*day_conditions))
+        day += timedelta(days=1)
+    return or_(*conditions)
 
 
 class EventRepository:
@@ -40,6 +55,70 @@ class EventRepository:
         await self._session.flush()
         return event.event_id
     
+    async def add_events_bulk(self, user_id: int, events: Iterable[Dict[str, str]], event_date: Optional[date]=None) -> List[Row]:
+        """
+        Добавляет несколько событий одним INSERT ... RETURNING.
+        events — словари с ключами name, start_time, end_time ("HH:MM"), tag, как в ROUTINE_TEMPLATES.
+        Возвращает строки (event_id, name, tag) добавленных событий.
+        """
+        if event_date is None:
+            event_date = dt.now(ZoneInfo("Europe/Moscow")).date()
+        stamp = int(time.time() * 1000)
+        values = [
+            {
+                # Номер в пачке вместо случайного суффикса: в одну миллисекунду id не совпадут
+                "event_id": f"evt_{user_id}_{stamp}_{100 + i}",
+                "user_id": user_id,
+                "name": event["name"] or "Не указано",
+                "start_time": dt_time.fromisoformat(event["start_time"]),
+                "end_time": dt_time.fromisoformat(event["end_time"]),
+                "event_date": event_date,
+                "tag": event["tag"],
+                "status": "pending",
+            }
+            for i, event in enumerate(events)
+        ]
+        if not values:
+            return []
+        stmt = insert(Event).values(values).returning(Event.event_id, Event.name, Event.tag)
+        result = await self._session.execute(stmt)
+        return result.all()
+
+    async def copy_day(self, user_id: int, source_date: date, target_date: date) -> List[Row]:
+        """
+        Копирует события пользователя с одной даты на другую одним INSERT ... SELECT на стороне БД.
+        Подготовленные советы копируются вместе с событиями.
+        Возвращает строки (event_id, name, tag, advice) новых событий.
+        """
+        stamp = literal(f"{int(time.time() * 1000)}_")
+        # id исходной строки уникален, поэтому и новые event_id не пересекаются
+        new_event_id = literal(f"evt_{user_id}_") + stamp + cast(Event.id, String)
+        source = (
+            select(
+                new_event_id,
+                Event.user_id,
+                Event.name,
+                literal(target_date),
+                Event.start_time,
+                Event.end_time,
+                Event.tag,
+                Event.advice,
+                literal("pending"),
+            )
+            .where(Event.user_id == user_id, Event.event_date == source_date)
+            .order_by(Event.start_time)
+        )
+        stmt = (
+            insert(Event)
+            .from_select(
+                ["event_id", "user_id", "name", "event_date", "start_time", "end_time", "tag", "advice", "status"],
+                source,
+            )
+            .returning(Event.event_id, Event.name, Event.tag, Event.advice)
+        )
+        result = await self._session.execute(stmt)
+        return result.all()
+
     async def get_user_events(self, user_id: int, event_date: Optional[date]=None) -> List[Event]:
         """Возвращает все события пользователя, отсортированные по времени начала."""
         if event_date is None:
@@ -52,6 +131,72 @@ class EventRepository:
         result = await self._session.execute(stmt)
         return result.scalars().all()
 
+    async def get_due_events(self, start: dt, end: dt) -> List[Row]:
+        """
+        Возвращает события, которые начинаются в полуинтервале [start, end),
+        у пользователей с включенными уведомлениями.
+        Интервал может переходить через полночь.
+        """
+        stmt = (
+            select(Event.user_id, Event.name, Event.tag, Event.advice)
+            .join(User, User.user_id == Event.user_id)
+            .where(_starts_between(start, end), User.notifications_enabled)
+            .order_by(Event.event_date, Event.start_time)
+        )
+        result = await self._session.execute(stmt)
+        return result.all()
+
+    async def stream_events_for_date(self, event_date: date, batch_size: int = 1000) -> AsyncIterator[Row]:
+        """
+        Потоково отдает события всех пользователей на дату,
+        упорядоченные по user_id и времени начала.
+        """
+        stmt = (
+            select(Event.user_id, Event.name, Event.tag, Event.start_time, Event.end_time)
+            .where(Event.event_date == event_date)
+            .order_by(Event.user_id, Event.start_time)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self._session.stream(stmt)
+        async for row in result:
+            yield row
+
+    async def get_events_without_advice(self, since: dt, until: dt, limit: int = 500) -> List[Row]:
+        """
+        Возвращает события без подготовленного совета, начинающиеся в [since, until).
+        События, для которых совет не удалось получить MAX_ADVICE_ATTEMPTS раз, пропускаются.
+        """
+        stmt = (
+            select(Event.user_id, Event.event_id, Event.name, Event.tag)
+            .where(
+                Event.advice.is_(None),
+                Event.advice_attempts < MAX_ADVICE_ATTEMPTS,
+                _starts_between(since, until),
+            )
+            .order_by(Event.event_date, Event.start_time)
+            .limit(limit)
+        )
+        result = await self._session.execute(stmt)
+        return result.all()
+
+    async def set_advice(self, event_id: str, advice: str) -> bool:
+        """Сохраняет совет для события. Возвращает False, если события уже нет."""
+        stmt = update(Event).where(Event.event_id == event_id).values(advice=advice)
+        result = await self._session.execute(stmt)
+        return result.rowcount > 0
+
+    async def mark_advice_failed(self, event_ids: List[str]) -> int:
+        """Учитывает неудачную попытку получить совет для событий."""
+        if not event_ids:
+            return 0
+        stmt = (
+            update(Event)
+            .where(Event.event_id.in_(event_ids), Event.advice.is_(None))
+            .values(advice_attempts=Event.advice_attempts + 1)
+        )
+        result = await self._session.execute(stmt)
+        return result.rowcount
+
     async def get_event_by_id(self, event_id: str) -> Optional[Event]:
         """Возвращает одно событие по его ID."""
         stmt = select(Event).where(Event.event_id == event_id)
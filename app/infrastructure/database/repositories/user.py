@@ -1,54 +1,118 @@
+import time
 from datetime import datetime as dt, timedelta, timezone
-from typing import Any, List, Dict, Set, Optional
+from typing import Any, List, Dict, Set, Optional, Tuple
 
-from sqlalchemy import select, update, func
+from sqlalchemy import exists, select, union_all, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.infrastructure.database.models import User, CheckIn
+from app.infrastructure.database.profile_cache import UserProfile, UserProfileCache, dirty_profiles, mark_profiles_dirty
 from app.core.enums import UserRole
 
+# last_active пишется не чаще раза в этот интервал: меньше перезаписей строк и WAL
+LAST_ACTIVE_GRANULARITY = timedelta(minutes=5)
+
+
+class StatisticsSnapshot:
+    """Снимок статистики для /stats, общий для всех сессий процесса. Живёт `ttl` секунд."""
+
+    def __init__(self, ttl: int = 60):
+        self.ttl = ttl
+        self._value: Optional[Tuple[float, Dict[str, Any]]] = None
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        if self._value is not None and self._value[0] > time.monotonic():
+            return self._value[1]
+        return None
+
+    def set(self, stats: Dict[str, Any]) -> None:
+        self._value = (time.monotonic() + self.ttl, stats)
 
 
 class UserRepository:
-    def __init__(self, session: AsyncSession, admin_ids: Set[int]):
+    def __init__(
+        self,
+        session: AsyncSession,
+        admin_ids: Set[int],
+        profiles: Optional[UserProfileCache] = None,
+        last_active_granularity: timedelta = LAST_ACTIVE_GRANULARITY,
+        statistics: Optional[StatisticsSnapshot] = None,
+    ):
         self._session = session
         self.admin_ids = admin_ids
+        self.profiles = profiles
+        self.last_active_granularity = last_active_granularity
+        self.statistics = statistics
 
-    async def get_or_create_user(self, user_id: int) -> User:
+    async def get_profile(self, user_id: int) -> Optional[UserProfile]:
         """
-        Получает пользователя по ID или создает нового, если он не найден.
-        Обновляет время последней активности.
+        Роль, уведомления, онбординг и бан пользователя одним запросом, через кэш профилей.
+        Профили, изменённые в текущей транзакции, читаются из БД мимо кэша.
         """
+        use_cache = self.profiles is not None and user_id not in dirty_profiles(self._session)
+        if use_cache:
+            profile, version = await self.profiles.get(user_id)
+            if profile is not None:
+                return profile
+
         stmt = (
-            select(User)
+            select(User.role, User.notifications_enabled, User.onboarding_completed, User.banned)
             .where(User.user_id == user_id)
         )
-        result = await self._session.execute(stmt)
-        user = result.scalar_one_or_none()
-        
-        if user is not None:
-            user.last_active = func.now()
-            await self._session.flush()
-            return user
-            
+        row = (await self._session.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+        profile = UserProfile(*row)
+        if use_cache:
+            await self.profiles.set(user_id, profile, version)
+        return profile
+
+    def _profiles_changed(self, *user_ids: int) -> None:
+        mark_profiles_dirty(self._session, user_ids)
+
+    async def get_or_create_user(self, user_id: int) -> User:
+        """
+        Получает пользователя по ID или создает нового, если он не найден.
+        Обновляет время последней активности, если оно старше `last_active_granularity`.
+        Один запрос: INSERT ... ON CONFLICT DO UPDATE ... WHERE в CTE и, если строку
+        не пришлось трогать, чтение существующей через UNION ALL.
+        """
         role = UserRole.ADMIN if user_id in self.admin_ids else UserRole.USER
-        
-        new_user = User(
-            user_id=user_id,
-            role=role,
-            last_active=func.now()
+        upsert = pg_insert(User).values(user_id=user_id, role=role, last_active=func.now())
+        upsert = (
+            upsert.on_conflict_do_update(
+                index_elements=[User.user_id],
+                set_={"last_active": func.now()},
+                where=User.last_active < func.now() - self.last_active_granularity,
+            )
+            .returning(*User.__table__.c)
+            .cte("upserted")
+        )
+        existing = select(*User.__table__.c).where(
+            User.user_id == user_id,
+            ~exists(select(upsert.c.id)),
         )
+        stmt = select(User).from_statement(union_all(select(*upsert.c), existing))
+        result = await self._session.execute(stmt)
+        user = result.scalar_one_or_none()
+        if user is None:
+            # Гонка первого контакта: строку только что вставила параллельная транзакция,
+            # наш INSERT дождался её и не обновил, а снимок запроса её ещё не видит.
+            # Новый запрос берёт свежий снимок
+            user = await self.get_by_id(user_id)
+        return user
         
-        self._session.add(new_user)
-        await self._session.flush()
-        await self._session.refresh(new_user)
-        return new_user
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        stmt = select(User).where(User.user_id == user_id)
+        result = await self._session.execute(stmt)
+        return result.scalar_one_or_none()
         
     async def delete_user(self, user_id: int):
         user = await self.get_by_id(user_id=user_id)
         if user:
             await self._session.delete(user)
+            self._profiles_changed(user_id)
     
     async def update_user_settings(self, user_id: int, key: str, value: Any) -> None:
         """Обновляет указанное поле в настройках пользователя."""
@@ -58,23 +122,29 @@ class UserRepository:
             .values({key: value})
         )
         await self._session.execute(stmt)
+        self._profiles_changed(user_id)
     
     async def get_notifications_status_by_id(self, user_id: int) -> Optional[bool]:
         """Получает статус уведомлений по user_id"""
-        stmt = (
-            select(User.notifications_enabled)
-            .filter(User.user_id == user_id)
-        )
-        result = await self._session.execute(stmt)
-        return result.scalar_one_or_none()
+        profile = await self.get_profile(user_id)
+        return profile.notifications_enabled if profile else None
     
-    async def toggle_notifications(self, user_id: int) -> None:
-        """Переключает статус уведомлений"""
+    async def get_user_banned_status_by_id(self, user_id: int) -> bool:
+        """Забанен ли пользователь (неизвестные пользователи не забанены)."""
+        profile = await self.get_profile(user_id)
+        return profile.banned if profile else False
+    
+    async def set_banned(self, user_id: int, banned: bool = True) -> None:
+        await self.update_user_settings(user_id, "banned", banned)
+    
+    async def toggle_notifications(self, user_id: int) -> bool:
+        """Переключает статус уведомлений и возвращает новый"""
         current = await self.get_notifications_status_by_id(user_id)
         
         new = not current
         
         await self.update_user_settings(user_id, User.notifications_enabled, new)
+        return new
     
     async def set_inactive(self, user_id: int, reason: str = "manual") -> bool:
         """
@@ -100,15 +170,30 @@ class UserRepository:
         user.last_active = dt(2020, 1, 1, tzinfo=timezone.utc)
         
         await self._session.flush()        
+        self._profiles_changed(user_id)
         return True
     
-    async def get_user_role(self, user_id: int) -> Optional[UserRole]:
+    async def set_inactive_many(self, user_ids: List[int]) -> int:
+        """
+        Помечает неактивными сразу нескольких пользователей одним запросом
+        (аналог set_inactive для результатов рассылки).
+        
+        :return: количество обновлённых пользователей
+        """
+        if not user_ids:
+            return 0
         stmt = (
-            select(User.role)
-            .filter(User.user_id == user_id)
+            update(User)
+            .where(User.user_id.in_(user_ids))
+            .values(notifications_enabled=False, last_active=dt(2020, 1, 1, tzinfo=timezone.utc))
         )
         result = await self._session.execute(stmt)
-        return result.scalar_one_or_none()
+        self._profiles_changed(*user_ids)
+        return result.rowcount
+    
+    async def get_user_role(self, user_id: int) -> Optional[UserRole]:
+        profile = await self.get_profile(user_id)
+        return profile.role if profile else None
     
     async def set_onboarding_complete(self, user_id: int) -> None:
         """Устанавливает флаг завершения онбординга для пользователя."""
@@ -133,44 +218,84 @@ class UserRepository:
         result = await self._session.execute(stmt)
         return result.scalars().all()
     
+    async def get_active_user_ids_page(self, after_user_id: int = 0, limit: int = 1000, days: int = 14) -> List[int]:
+        """
+        Страница из get_active_user_ids: до `limit` активных пользователей
+        с user_id больше `after_user_id`, по возрастанию user_id.
+        Позволяет обходить аудиторию порциями и продолжать обход с сохраненного места.
+        """
+        threshold = dt.now(timezone.utc) - timedelta(days=days)
+        stmt = (
+            select(User.user_id)
+            .where(User.last_active >= threshold, User.user_id > after_user_id)
+            .order_by(User.user_id)
+            .limit(limit)
+        )
+        result = await self._session.execute(stmt)
+        return result.scalars().all()
+    
+    async def get_audience_page(self, after_user_id: int = 0, limit: int = 1000, days: int = 14) -> List[int]:
+        """
+        Страница аудитории плановых рассылок: пользователи с включенными уведомлениями,
+        активные за последние `days` дней (set_inactive выключает уведомления
+        заблокировавшим бота, поэтому они сюда не попадают).
+        Порядок и пагинация — по user_id, как в get_active_user_ids_page.
+        """
+        threshold = dt.now(timezone.utc) - timedelta(days=days)
+        stmt = (
+            select(User.user_id)
+            .where(
+                User.notifications_enabled,
+                User.last_active >= threshold,
+                User.user_id > after_user_id,
+            )
+            .order_by(User.user_id)
+            .limit(limit)
+        )
+        result = await self._session.execute(stmt)
+        return result.scalars().all()
+    
     async def get_statistics(self) -> Dict[str, Any]:
-        """Собирает и возвращает статистику по базе данных."""
-        total_users_stmt = select(func.count(User.id))
-        total_users = (await self._session.execute(total_users_stmt)).scalar_one()
-
-        if total_users == 0:
-            return {"error": "No users yet."}
-
-        onboarded_users_stmt = select(func.count(User.id)).where(User.onboarding_completed)
-        onboarded_users = (await self._session.execute(onboarded_users_stmt)).scalar_one()
+        """
+        Собирает статистику по базе одним запросом. Результат кладётся в снимок `statistics`:
+        повторные /stats не пересчитывают агрегаты по всем пользователям и чек-инам.
+        """
+        cached = self.statistics.get() if self.statistics is not None else None
+        if cached is not None:
+            return cached
 
         seven_days_ago = dt.now(timezone.utc) - timedelta(days=7)
-        retention_stmt = select(func.count(User.id)).where(User.last_active > seven_days_ago)
-        retention_7_days = (await self._session.execute(retention_stmt)).scalar_one()
+        stmt = select(
+            func.count().label("total_users"),
+            func.count().filter(User.onboarding_completed).label("onboarded_users"),
+            func.count().filter(User.last_active > seven_days_ago).label("retention_7_days"),
+            func.min(User.created_at).label("first_user_time"),
+            select(func.count()).select_from(CheckIn).scalar_subquery().label("total_checkins"),
+        ).select_from(User)
+        row = (await self._session.execute(stmt)).one()
 
-        total_checkins_stmt = select(func.count(CheckIn.id))
-        total_checkins = (await self._session.execute(total_checkins_stmt)).scalar_one()
+        if row.total_users == 0:
+            return {"error": "No users yet."}
 
-        first_user_time_stmt = select(func.min(User.created_at))
-        first_user_time = (await self._session.execute(first_user_time_stmt)).scalar_one()
-        
-        avg_checkins_per_day = 0
+        first_user_time = row.first_user_time
         if first_user_time.tzinfo is not None:
             first_user_date = first_user_time.astimezone(timezone.utc).date()
         else:
             first_user_date = first_user_time.date()
         
-        current_date = dt.now(timezone.utc).date()
-        
-        days_since_first_user = (current_date - first_user_date).days
+        days_since_first_user = (dt.now(timezone.utc).date() - first_user_date).days
         
+        avg_checkins_per_day = 0
         if days_since_first_user > 0:
-            avg_checkins_per_day = total_checkins / days_since_first_user
+            avg_checkins_per_day = row.total_checkins / days_since_first_user
 
-        return {
-            "total_users": total_users,
-            "onboarding_completion_rate": (onboarded_users / total_users) * 100 if total_users > 0 else 0,
-            "retention_7_days_count": retention_7_days,
-            "total_checkins": total_checkins,
+        stats = {
+            "total_users": row.total_users,
+            "onboarding_completion_rate": (row.onboarded_users / row.total_users) * 100,
+            "retention_7_days_count": row.retention_7_days,
+            "total_checkins": row.total_checkins,
             "avg_checkins_per_day": avg_checkins_per_day,
-        }
\ No newline at end of file
+        }
+        if self.statistics is not None:
+            self.statistics.set(stats)
+        return stats
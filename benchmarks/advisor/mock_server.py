@@ -0,0 +1,130 @@
+"""
+Локальная заглушка API completion YandexGPT для бенчмарков советника.
+
+Отвечает в формате /foundationModels/v1/completion с настраиваемой задержкой,
+долей ошибок (HTTP 500) и долей «зависших» запросов, которые не отвечают дольше таймаута.
+На пакетные запросы (`get_advice_batch`) отдаёт JSON-массив нужной длины.
+
+    python -m benchmarks.advisor.mock_server --port 8081 --latency lognormal --median 0.8 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from dataclasses import dataclass
+
+from aiohttp import web
+
+COMPLETION_PATH = "/foundationModels/v1/completion"
+
+_ACTIVITY = re.compile(r'Активность: "([^"]*)"')
+_BATCH = re.compile(r"JSON-массив из (\d+) строк")
+
+
+@dataclass
+class MockConfig:
+    latency: str = "lognormal"  # const | uniform | exponential | lognormal
+    median: float = 0.8
+    sigma: float = 0.5
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    hang: float = 60.0
+    seed: int = 42
+
+
+class MockLLM:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.requests = 0
+        self.errors = 0
+        self.hangs = 0
+
+    def _delay(self) -> float:
+        c = self.config
+        if c.latency == "const":
+            return c.median
+        if c.latency == "uniform":
+            return self.random.uniform(0, 2 * c.median)
+        if c.latency == "exponential":
+            return self.random.expovariate(1 / c.median) if c.median > 0 else 0.0
+        return self.random.lognormvariate(0, c.sigma) * c.median
+
+    async def completion(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        prompt = payload["messages"][-1]["text"]
+
+        roll = self.random.random()
+        if roll < self.config.timeout_rate:
+            self.hangs += 1
+            await asyncio.sleep(self.config.hang)
+        await asyncio.sleep(self._delay())
+        if roll < self.config.timeout_rate + self.config.error_rate:
+            self.errors += 1
+            return web.json_response({"error": "mock failure"}, status=500)
+
+        activities = _ACTIVITY.findall(prompt)
+        batch = _BATCH.search(prompt)
+        if batch:
+            items = activities[-int(batch.group(1)):]
+            text = json.dumps([self._advice(activity) for activity in items], ensure_ascii=False)
+        else:
+            text = self._advice(activities[-1] if activities else "")
+        return web.json_response({
+            "result": {
+                "alternatives": [{"message": {"role": "assistant", "text": text}, "status": "ALTERNATIVE_STATUS_FINAL"}],
+                "modelVersion": "mock",
+            }
+        })
+
+    def _advice(self, activity: str) -> str:
+        return f"Можно попробовать сделать короткую паузу перед «{activity[:40]}» и глубоко вдохнуть."
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(COMPLETION_PATH, self.completion)
+        return app
+
+
+async def start_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0):
+    """Запускает заглушку в текущем цикле событий. Возвращает (MockLLM, runner, base_url)."""
+    mock = MockLLM(config)
+    runner = web.AppRunner(mock.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return mock, runner, f"http://{host}:{bound_port}"
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", choices=["const", "uniform", "exponential", "lognormal"], default="lognormal")
+    parser.add_argument("--median", type=float, default=0.8, help="медианная задержка ответа, с")
+    parser.add_argument("--sigma", type=float, default=0.5, help="разброс для lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="доля зависших запросов")
+    parser.add_argument("--hang", type=float, default=60.0, help="сколько висит зависший запрос, с")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def mock_config(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        median=args.median,
+        sigma=args.sigma,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        hang=args.hang,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(MockLLM(mock_config(args)).app(), host=args.host, port=args.port)
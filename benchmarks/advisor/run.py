@@ -0,0 +1,121 @@
+"""
+Бенчмарк `Advisor_AI.get_advice` без настоящего YandexGPT.
+
+Поднимает заглушку из `mock_server` (или использует внешнюю через --base-url), гоняет
+заданное число запросов с заданной конкурентностью и печатает p50/p95/p99 задержки,
+долю запасных советов, попадания в кэш и число запросов, дошедших до «модели».
+Активности выбираются по закону Ципфа из фиксированного словаря с опечатками и знаками
+препинания, поэтому работают и точный кэш, и индекс похожих активностей.
+
+Запускать из корня репозитория с заполненным .env (импорт `app` читает настройки):
+
+    python -m benchmarks.advisor.run --requests 2000 --concurrency 64 --median 0.8 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import List, Tuple
+
+from app.bot.templates import TAGS
+from app.core.AI import AdviceCache, Advisor_AI, SimilarityIndex
+
+from benchmarks.advisor.mock_server import add_mock_arguments, mock_config, start_server
+
+ACTIVITIES = [
+    "Уроки в школе", "Обед в столовой", "Прогулка в парке", "Домашняя работа",
+    "Тренировка по футболу", "Поездка в метро", "Музыкальная школа", "Ужин с семьей",
+    "Кружок робототехники", "Поход в магазин", "Бассейн", "Репетитор по математике",
+    "Чтение перед сном", "Перемена", "Контрольная работа", "День рождения друга",
+]
+VARIANTS = [
+    lambda s: s,
+    lambda s: s.lower(),
+    lambda s: s + "!!",
+    lambda s: s.split()[0],
+    lambda s: s.lower().replace("е", "ё", 1),
+]
+
+
+def build_workload(size: int, distinct: int, seed: int) -> List[Tuple[str, str]]:
+    rnd = random.Random(seed)
+    pool = [
+        (rnd.choice(VARIANTS)(rnd.choice(ACTIVITIES)), rnd.choice(list(TAGS)))
+        for _ in range(distinct)
+    ]
+    weights = [1 / rank for rank in range(1, len(pool) + 1)]
+    return rnd.choices(pool, weights=weights, k=size)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run(args: argparse.Namespace) -> None:
+    mock, runner = None, None
+    base_url = args.base_url
+    if base_url is None:
+        mock, runner, base_url = await start_server(mock_config(args))
+
+    advisor = Advisor_AI(
+        catalog_id="bench",
+        api_key="bench",
+        cache=AdviceCache(redis=None, variants=args.variants),
+        max_concurrency=args.max_concurrency,
+        timeout=args.timeout,
+        base_url=base_url,
+        similar=SimilarityIndex(threshold=args.similarity if args.similarity > 0 else float("inf")),
+    )
+    await advisor.start()
+
+    workload = build_workload(args.requests, args.distinct, args.seed)
+    queue: asyncio.Queue[Tuple[str, str]] = asyncio.Queue()
+    for item in workload:
+        queue.put_nowait(item)
+    latencies: List[float] = []
+    fallbacks = 0
+
+    async def worker() -> None:
+        nonlocal fallbacks
+        while not queue.empty():
+            activity, tag = queue.get_nowait()
+            started = time.perf_counter()
+            _, used_ai = await advisor.get_advice(activity, tag)
+            latencies.append(time.perf_counter() - started)
+            fallbacks += not used_ai
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    stats = advisor.stats()
+    await advisor.close()
+    if runner is not None:
+        await runner.cleanup()
+
+    cache, similar, breaker = stats["cache"], stats["similar"], stats["breaker"]
+    print(f"requests:        {len(latencies)} at concurrency {args.concurrency} in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} req/s)")
+    print(f"latency:         p50 {percentile(latencies, 0.50) * 1000:.1f}ms  p95 {percentile(latencies, 0.95) * 1000:.1f}ms  p99 {percentile(latencies, 0.99) * 1000:.1f}ms")
+    print(f"fallback rate:   {fallbacks / len(latencies) * 100:.2f}%")
+    print(f"cache hit rate:  {cache['hit_rate']:.2f}% exact, {similar['hits']} similar")
+    print(f"coalesced:       {stats['coalesced']}")
+    print(f"breaker:         {breaker['state']}, trips {breaker['trips']}, rejected {breaker['rejected']}")
+    if mock is not None:
+        print(f"upstream calls:  {mock.requests} ({mock.errors} errors, {mock.hangs} hung)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--distinct", type=int, default=200, help="число разных пар (активность, тег)")
+    parser.add_argument("--variants", type=int, default=3, help="вариантов совета на ключ в кэше")
+    parser.add_argument("--similarity", type=float, default=0.55, help="порог индекса похожих, 0 — выключить")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="лимит одновременных запросов к модели")
+    parser.add_argument("--timeout", type=float, default=10.0, help="максимальный таймаут запроса, с")
+    parser.add_argument("--base-url", default=None, help="внешняя заглушка вместо встроенной")
+    add_mock_arguments(parser)
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,198 @@
+"""
+Планы запросов для горячих выборок бота: EXPLAIN (ANALYZE, BUFFERS) по каждой форме запроса
+с индексами и, для сравнения, с запрещёнными индексными сканами.
+
+По умолчанию работает с базой из .env. Синтетические данные (пользователи с user_id от
+BENCH_USER_ID и их события/чекины) добавляются только с --seed и удаляются с --cleanup —
+не запускайте --seed на боевой базе.
+
+    python -m benchmarks.db.query_plans --seed 50000
+    python -m benchmarks.db.query_plans
+    python -m benchmarks.db.query_plans --cleanup
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime as dt, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+from zoneinfo import ZoneInfo
+
+import asyncpg
+
+BENCH_USER_ID = 9_000_000_000
+
+SEED_SQL = [
+    """
+    INSERT INTO users (user_id, notifications_enabled, onboarding_completed, last_active)
+    SELECT $1::bigint + g, random() < 0.9, true, now() - random() * interval '60 days'
+    FROM generate_series(1, $2::int) AS g
+    ON CONFLICT (user_id) DO NOTHING
+    """,
+    """
+    INSERT INTO events (event_id, user_id, name, event_date, start_time, end_time, tag, advice)
+    SELECT 'bench_' || u.user_id || '_' || d || '_' || e,
+           u.user_id,
+           'Событие ' || e,
+           current_date + d,
+           time '07:00' + e * interval '2 hours',
+           time '08:00' + e * interval '2 hours',
+           (ARRAY['notag', 'quiet', 'loud', 'crowd', 'bright', 'dim', 'calm'])[1 + e],
+           CASE WHEN random() < 0.8 THEN 'Совет' END
+    FROM users u, generate_series(-7, 7) AS d, generate_series(0, 6) AS e
+    WHERE u.user_id > $1::bigint
+    ON CONFLICT (event_id) DO NOTHING
+    """,
+    """
+    INSERT INTO checkins (user_id, timestamp, check_in_type, data)
+    SELECT u.user_id, now() - random() * interval '90 days', 'day', '{"feeling": "🙂"}'::jsonb
+    FROM users u, generate_series(1, 20)
+    WHERE u.user_id > $1::bigint
+    """,
+]
+
+# Месячные секции checkins под чекины за последние 90 дней из SEED_SQL: на свежей базе
+# миграция создаёт секции только с текущего месяца, остальное ушло бы в checkins_default
+SEED_PARTITIONS_SQL = """
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', (now() - interval '90 days') AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC'),
+            interval '1 month'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF checkins FOR VALUES FROM (%L) TO (%L)',
+            'checkins_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+            month::text || ' 00:00+00',
+            (month + interval '1 month')::date::text || ' 00:00+00'
+        );
+    END LOOP;
+END $$
+"""
+
+CLEANUP_SQL = [
+    "DELETE FROM checkins WHERE user_id > $1::bigint",
+    "DELETE FROM events WHERE user_id > $1::bigint",
+    "DELETE FROM users WHERE user_id > $1::bigint",
+]
+
+
+def query_shapes() -> List[Tuple[str, str, str, List[Any]]]:
+    """(название, ожидаемый индекс, SQL, параметры) — те же формы, что строят репозитории."""
+    now = dt.now(ZoneInfo("Europe/Moscow"))
+    today = now.date()
+    user_id = BENCH_USER_ID + 1
+    threshold = dt.now(timezone.utc) - timedelta(days=14)
+    return [
+        (
+            "EventRepository.get_user_events",
+            "ix_events_user_id_event_date_start_time",
+            "SELECT * FROM events WHERE user_id = $1 AND event_date = $2 ORDER BY start_time",
+            [user_id, today],
+        ),
+        (
+            "EventRepository.get_next_event_by_user_id",
+            "ix_events_user_id_event_date_start_time",
+            "SELECT * FROM events WHERE user_id = $1 AND event_date = $2 AND start_time > $3 "
+            "ORDER BY start_time LIMIT 1",
+            [user_id, today, now.time()],
+        ),
+        (
+            "EventRepository.get_due_events",
+            "ix_events_event_date_start_time",
+            "SELECT e.user_id, e.name, e.tag, e.advice FROM events e JOIN users u ON u.user_id = e.user_id "
+            "WHERE u.notifications_enabled AND e.event_date = $1 AND e.start_time >= $2 AND e.start_time < $3",
+            [today, now.time(), (now + timedelta(minutes=1)).time()],
+        ),
+        (
+            "EventRepository.get_events_without_advice",
+            "ix_events_pending_advice",
+            "SELECT user_id, event_id, name, tag FROM events "
+            "WHERE advice IS NULL AND advice_attempts < 3 AND event_date = $1 AND start_time >= $2 "
+            "ORDER BY event_date, start_time LIMIT 500",
+            [today, now.time()],
+        ),
+        (
+            "UserRepository.get_active_user_ids",
+            "ix_users_last_active",
+            "SELECT user_id FROM users WHERE last_active >= $1",
+            [threshold],
+        ),
+        (
+            "UserRepository.get_audience_page",
+            "ix_users_audience",
+            "SELECT user_id FROM users WHERE notifications_enabled AND last_active >= $1 AND user_id > $2 "
+            "ORDER BY user_id LIMIT 1000",
+            [threshold, BENCH_USER_ID],
+        ),
+        (
+            "check-in history",
+            "ix_checkins_user_id_timestamp",
+            "SELECT * FROM checkins WHERE user_id = $1 ORDER BY timestamp DESC LIMIT 20",
+            [user_id],
+        ),
+    ]
+
+
+def _indexes_used(plan: Dict[str, Any]) -> List[str]:
+    found = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", []):
+        found.extend(_indexes_used(child))
+    return found
+
+
+async def explain(conn: asyncpg.Connection, sql: str, params: List[Any]) -> Dict[str, Any]:
+    raw = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", *params)
+    return (json.loads(raw) if isinstance(raw, str) else raw)[0]
+
+
+async def run(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        if args.cleanup:
+            for sql in CLEANUP_SQL:
+                print(await conn.execute(sql, BENCH_USER_ID))
+            return
+        if args.seed:
+            await conn.execute(SEED_SQL[0], BENCH_USER_ID, args.seed)
+            await conn.execute(SEED_PARTITIONS_SQL)
+            for sql in SEED_SQL[1:]:
+                await conn.execute(sql, BENCH_USER_ID)
+            await conn.execute("ANALYZE users; ANALYZE events; ANALYZE checkins;")
+            print(f"Seeded {args.seed} users")
+
+        print(f"{'query':45} {'expected index':42} {'used':5} {'with idx, ms':>12} {'no idx, ms':>12}")
+        for name, index, sql, params in query_shapes():
+            result = await explain(conn, sql, params)
+            used = index in _indexes_used(result["Plan"])
+
+            # Базовая линия: тот же запрос без индексных сканов; SET LOCAL действует до конца транзакции
+            async with conn.transaction():
+                await conn.execute("SET LOCAL enable_indexscan = off; SET LOCAL enable_indexonlyscan = off; SET LOCAL enable_bitmapscan = off")
+                baseline = await explain(conn, sql, params)
+
+            print(
+                f"{name:45} {index:42} {'yes' if used else 'NO':5} "
+                f"{result['Execution Time']:12.2f} {baseline['Execution Time']:12.2f}"
+            )
+            if args.verbose:
+                print(json.dumps(result["Plan"], ensure_ascii=False, indent=2))
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=None, help="postgresql://... (по умолчанию из .env)")
+    parser.add_argument("--seed", type=int, default=0, help="добавить N синтетических пользователей")
+    parser.add_argument("--cleanup", action="store_true", help="удалить синтетические данные")
+    parser.add_argument("--verbose", action="store_true", help="печатать планы целиком")
+    args = parser.parse_args()
+    if args.dsn is None:
+        from config import settings
+        args.dsn = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+    asyncio.run(run(args))
@@ -17,6 +17,18 @@ class Settings(BaseSettings):
     DB_PORT: int
     DB_USER: str
     DB_PASSWORD: str
+    ACTIVITY_FLUSH_INTERVAL: float = 5.0
+    ACTIVITY_MAX_PENDING: int = 100000
+    LAST_ACTIVE_GRANULARITY: int = 300
+    PROFILE_CACHE_TTL: int = 600
+    STATISTICS_TTL: int = 60
+    CHECKIN_RETENTION_MONTHS: int = 12
+    CHECKIN_PARTITIONS_AHEAD: int = 3
+    CHECKIN_ARCHIVE_DIR: str = "/data/checkins"
+    CHECKIN_FLUSH_INTERVAL: float = 1.0
+    CHECKIN_BATCH_SIZE: int = 500
+    CHECKIN_SPILL_PATH: Optional[str] = "/data/checkins_pending.jsonl"
+    CHECKIN_MAX_PENDING: int = 10000
     
     # Redis    
     REDIS_DB_NUM: int
@@ -28,6 +40,19 @@ class Settings(BaseSettings):
     # YandexGPT
     YANDEX_GPT_API_KEY: str
     YANDEX_GPT_CATALOG_ID: str
+    YANDEX_GPT_BASE_URL: Optional[str] = None
+    ADVICE_CACHE_TTL: int = 7 * 24 * 60 * 60
+    ADVICE_CACHE_VARIANTS: int = 3
+    ADVICE_CACHE_SIZE: int = 2048
+    ADVICE_MAX_CONCURRENCY: int = 8
+    ADVICE_TIMEOUT: float = 10.0
+    ADVICE_INDEX_PATH: Optional[str] = "/data/advice_index.npz"
+    ADVICE_INDEX_SAVE_INTERVAL: int = 10 * 60
+    ADVICE_SIMILARITY_THRESHOLD: float = 0.55
+    
+    # Broadcasts
+    BROADCAST_RATE: float = 28
+    BROADCAST_WORKERS: int = 16
 
     model_config = SettingsConfigDict(
         env_file=".env",